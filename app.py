@@ -3,21 +3,25 @@ import streamlit as st
 # Set the page layout to wide
 st.set_page_config(layout="wide")
 
-import sys
 import os
 import time
-import datetime
-from io import StringIO
 import contextlib
-from mypipeline import run_full_pipeline
+import threading
+from mypipeline.jobs import ACTIVE_STATUSES, JobRunner
+from mypipeline.model_registry import prewarm
+from mypipeline.review_store import ReviewStore
+from mypipeline.aggregates import cube_path, hours_path
+from mypipeline.theme_detection import theme_hits_path
 
-import pandas as pd
 import plotly.express as px
-import pycountry
 import scipy.stats as stats
 
 from dashboard.pie_chart import render_pie_chart
 from dashboard.bar_chart import render_bar_chart
+from dashboard.data import file_fingerprint, load_cube, load_hours, load_results_theme_hits
+from dashboard.compare import (
+    month_range_filters, render_monthly_reviews_by_site, render_sentiment_by_site, site_summary
+)
 
 # Apply custom CSS styling globally
 st.markdown(
@@ -52,38 +56,33 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-# Function to capture logs in real-time
-class RealTimeLogger(StringIO):
-    def __init__(self, log_callback):
-        super().__init__()
-        self.log_callback = log_callback
-
-    def write(self, msg):
-        if msg.strip():
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            formatted_msg = f"[{timestamp}] {msg}"
-            super().write(formatted_msg)
-            self.log_callback(formatted_msg)
-
-# Function to run the pipeline and stream logs
-def run_pipeline(site_to_scrap, log_callback):
-    log_stream = RealTimeLogger(log_callback)
-    old_stdout = sys.stdout
-    sys.stdout = log_stream
-    try:
-        result_file = run_full_pipeline(site_to_scrap)
-        print(f"Final results saved to: {result_file}")
-        return result_file
-    finally:
-        sys.stdout = old_stdout
-
-def render_rating_distribution_by_month(df):
-    df['date'] = pd.to_datetime(df['date'])
-    df['month'] = df['date'].dt.to_period('M').astype(str)
-    df['month'] = df['date'].dt.strftime('%B %Y')
-    monthly_distribution = df.groupby('month')['rating'].count().reset_index()
+# Load the sentiment model once per server process, in the background so the
+# page renders immediately; pipeline runs reuse the warm handle
+@st.cache_resource
+def prewarm_models():
+    thread = threading.Thread(target=prewarm, daemon=True)
+    thread.start()
+    return thread
+
+prewarm_models()
+
+# Pipelines run as background jobs shared by every session of this server, so
+# a run never blocks the page and two requests for one site share a single run
+@st.cache_resource
+def get_job_runner():
+    return JobRunner()
+
+# Seconds between reruns while a job is in progress
+JOB_POLL_INTERVAL = 1.0
+
+# Every site's results, indexed for filtered and cross-site queries
+@st.cache_resource
+def get_review_store():
+    return ReviewStore()
+
+def render_rating_distribution_by_month(cube):
+    monthly_distribution = cube.groupby('month')['reviews'].sum().reset_index()
     monthly_distribution.columns = ['Month', 'Rating Count']
-    monthly_distribution['Month'] = pd.to_datetime(monthly_distribution['Month'])
     monthly_distribution = monthly_distribution.sort_values('Month')
 
     fig_month = px.bar(
@@ -98,10 +97,9 @@ def render_rating_distribution_by_month(df):
     fig_month.update_layout(xaxis_title='Month', yaxis_title='Number of Ratings')
     return fig_month
 
-def render_reviews_heatmap(df):
-    # Convert country codes to country names
-    df['country_name'] = df['country'].apply(lambda code: pycountry.countries.get(alpha_2=code).name if pycountry.countries.get(alpha_2=code) else code)
-    country_distribution = df['country_name'].value_counts().reset_index()
+def render_reviews_heatmap(cube):
+    # Country names are resolved once per code by dashboard.data.load_cube
+    country_distribution = cube.groupby('country_name')['reviews'].sum().sort_values(ascending=False).reset_index()
     country_distribution.columns = ['Country', 'Review Count']
 
     fig_map = px.choropleth(
@@ -124,19 +122,24 @@ def render_reviews_heatmap(df):
     )
     return fig_map
 
-def calculate_metrics(df):
-    total_reviews = len(df)
+def most_common(counts):
+    # Highest count first, ties in index order (as Series.mode breaks them)
+    return counts.sort_index().sort_values(ascending=False, kind='stable').index
+
+def calculate_metrics(cube, hours):
+    total_reviews = int(cube['reviews'].sum())
     
-    most_positive_country = df[df['rating'] == df['rating'].max()]['country'].mode()[0]
-    most_negative_country = df[df['rating'] == df['rating'].min()]['country'].mode()[0]
+    positive_countries = most_common(cube[cube['rating'] == cube['rating'].max()].groupby('country', observed=True)['reviews'].sum())
+    negative_countries = most_common(cube[cube['rating'] == cube['rating'].min()].groupby('country', observed=True)['reviews'].sum())
+    most_positive_country = positive_countries[0]
+    most_negative_country = negative_countries[0]
     
     # Ensure most positive and most negative countries are not the same
     if most_positive_country == most_negative_country:
-        second_most_negative_country = df[df['rating'] == df['rating'].min()]['country'].value_counts().index[1]
+        second_most_negative_country = negative_countries[1]
         most_negative_country = second_most_negative_country
     
-    df['hour'] = pd.to_datetime(df['date']).dt.hour
-    peak_review_hours = df['hour'].mode()[0]
+    peak_review_hours = int(most_common(hours.dropna().set_index('hour')['reviews'])[0])
     peak_review_period = "AM" if peak_review_hours < 12 else "PM"
     peak_review_hours = peak_review_hours % 12 if peak_review_hours > 12 else peak_review_hours
     
@@ -145,6 +148,23 @@ def calculate_metrics(df):
 def get_country_flag_url(country_code):
     return f"https://flagsapi.com/{country_code}/flat/64.png"
 
+# Metrics and figures depend only on the aggregate tables, so they are built
+# once per version of those tables and reused on every rerun
+@st.cache_data(show_spinner=False, max_entries=8)
+def build_dashboard(result_file, fingerprint, hits_fingerprint):
+    # Everything is drawn from the aggregate tables; review text is never loaded
+    cube = load_cube(result_file, fingerprint)
+    hours = load_hours(result_file, fingerprint)
+    theme_hits = load_results_theme_hits(result_file, hits_fingerprint)
+    metrics = calculate_metrics(cube, hours)
+    figures = (
+        render_pie_chart(cube),
+        render_bar_chart(cube, theme_hits=theme_hits),
+        render_rating_distribution_by_month(cube),
+        render_reviews_heatmap(cube),
+    )
+    return metrics, figures
+
 # Streamlit UI
 # st.set_page_config(layout="wide")  # Set the page layout to wide
 
@@ -155,56 +175,98 @@ st.title("DeliverMind: NLP Review Analysis Dashboard")
 # Input field for the site to review
 site_to_scrap = st.text_input("Enter the site to review (e.g., sendle.com):")
 
-# Button to trigger the pipeline
+# Button to trigger the pipeline; it only queues a job and returns at once
 if st.button("Run Pipeline"):
     if site_to_scrap:
-        # Display the "Running pipeline" message with a spinner
-        with st.spinner(f"Running pipeline for site: {site_to_scrap}..."):
-            st.subheader("Pipeline Logs")
-            logs_placeholder = st.empty()  # Placeholder for logs
-
-            logs = []  # Store logs
-
-            def update_logs(new_log):
-                logs.append(new_log)
-                logs_placeholder.text_area("Logs", "\n".join(logs), height=300)
-
-            # Run the pipeline
-            result_file = run_pipeline(site_to_scrap, update_logs)
-
-            # Once the pipeline finishes, load the result DataFrame
-            st.write("Pipeline finished. Loading results...")
-            df = pd.read_csv(result_file)  # Assuming the pipeline saves results to a CSV file
-
-            # Calculate metrics
-            total_reviews, most_positive_country, most_negative_country, peak_review_hours, peak_review_period = calculate_metrics(df)
-
-            # Display metrics cards
-            st.subheader("Metrics")
-            col1, col2, col3, col4 = st.columns(4)
-            col1.metric("Total Reviews", total_reviews)
-            
-            positive_flag_url = get_country_flag_url(most_positive_country)
-            negative_flag_url = get_country_flag_url(most_negative_country)
-            
-            col2.markdown(f"Most Positive Country: {most_positive_country} ![flag]({positive_flag_url})")
-            col3.markdown(f"Most Negative Country: {most_negative_country} ![flag]({negative_flag_url})")
-            col4.metric("Peak Review Hours", f"{peak_review_hours}:00 - {peak_review_hours + 1}:00 {peak_review_period}")
-
-            # Render the charts in real-time
-            fig_pie = render_pie_chart(df)
-            fig_bar = render_bar_chart(df)
-            fig_month = render_rating_distribution_by_month(df)
-            fig_map = render_reviews_heatmap(df)
-
-            if fig_pie and fig_bar:
-                col1, col2 = st.columns([0.6, 0.4])
-                with col1:
-                    st.plotly_chart(fig_bar, use_container_width=True)
-                with col2:
-                    st.plotly_chart(fig_pie, use_container_width=True)
-            
-            st.plotly_chart(fig_month, use_container_width=True)
-            st.plotly_chart(fig_map, use_container_width=True)
+        st.session_state["job_id"] = get_job_runner().submit(site_to_scrap)
     else:
         st.warning("Please enter a site to review.")
+
+# Poll the session's job: show its progress while it runs, load its results when done
+job_id = st.session_state.get("job_id")
+job = get_job_runner().get(job_id) if job_id else None
+job_running = job is not None and job["status"] in ACTIVE_STATUSES
+if job_running:
+    st.subheader(f"Running pipeline for site: {job['site']}")
+    st.progress(job["progress"], text=job["message"] or "Starting...")
+    st.code("\n".join(job["log"]), language=None)
+elif job is not None:
+    del st.session_state["job_id"]
+    if job["status"] == "succeeded":
+        print(f"Final results saved to: {job['result']}")
+        st.session_state["result_file"] = job["result"]
+    else:
+        st.error(f"Pipeline for {job['site']} {job['status']}: {job['error'] or job['message']}")
+        st.code("\n".join(job["log"]), language=None)
+
+# Results stay on screen across reruns and are only rebuilt when the file changes
+result_file = st.session_state.get("result_file")
+if result_file and os.path.exists(cube_path(result_file)):
+    # The hours table is written after the cube, so its fingerprint covers both
+    (total_reviews, most_positive_country, most_negative_country, peak_review_hours, peak_review_period), (
+        fig_pie, fig_bar, fig_month, fig_map
+    ) = build_dashboard(result_file, file_fingerprint(hours_path(result_file)), file_fingerprint(theme_hits_path(result_file)))
+
+    # Display metrics cards
+    st.subheader("Metrics")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Total Reviews", total_reviews)
+    
+    positive_flag_url = get_country_flag_url(most_positive_country)
+    negative_flag_url = get_country_flag_url(most_negative_country)
+    
+    col2.markdown(f"Most Positive Country: {most_positive_country} ![flag]({positive_flag_url})")
+    col3.markdown(f"Most Negative Country: {most_negative_country} ![flag]({negative_flag_url})")
+    col4.metric("Peak Review Hours", f"{peak_review_hours}:00 - {peak_review_hours + 1}:00 {peak_review_period}")
+
+    if fig_pie and fig_bar:
+        col1, col2 = st.columns([0.6, 0.4])
+        with col1:
+            st.plotly_chart(fig_bar, use_container_width=True)
+        with col2:
+            st.plotly_chart(fig_pie, use_container_width=True)
+    
+    st.plotly_chart(fig_month, use_container_width=True)
+    st.plotly_chart(fig_map, use_container_width=True)
+
+# Cross-site comparison; filters run as queries on the review store, so no
+# results file is loaded
+review_store = get_review_store()
+store_sites = review_store.sites()
+if store_sites:
+    st.subheader("Compare Sites")
+    options = review_store.options()
+    col1, col2 = st.columns(2)
+    selected_sites = col1.multiselect("Sites", store_sites, default=store_sites)
+    filters = {}
+    months = options["months"]
+    if len(months) > 1:
+        start_month, end_month = col2.select_slider("Months", options=months, value=(months[0], months[-1]))
+        filters.update(month_range_filters(start_month, end_month))
+    col1, col2, col3, col4 = st.columns(4)
+    filters.update(
+        sites=selected_sites,
+        countries=col1.multiselect("Countries", options["countries"], placeholder="All countries"),
+        ratings=col2.multiselect("Ratings", options["ratings"], placeholder="All ratings"),
+        sentiments=col3.multiselect("Sentiments", options["sentiments"], placeholder="All sentiments"),
+        themes=col4.multiselect("Themes", options["themes"], placeholder="All themes"),
+    )
+
+    by_sentiment = review_store.counts(["site", "sentiment"], **filters)
+    if by_sentiment.empty:
+        st.info("No reviews match these filters.")
+    else:
+        st.dataframe(site_summary(by_sentiment), hide_index=True, use_container_width=True)
+        col1, col2 = st.columns([0.4, 0.6])
+        with col1:
+            st.plotly_chart(render_sentiment_by_site(by_sentiment), use_container_width=True)
+        with col2:
+            by_month = review_store.counts(["site", "month"], **filters)
+            st.plotly_chart(render_monthly_reviews_by_site(by_month), use_container_width=True)
+        with st.expander("Matching reviews"):
+            st.dataframe(review_store.sample(limit=50, **filters), hide_index=True, use_container_width=True)
+
+# Results of an earlier run stay on screen while the next job runs
+if job_running:
+    time.sleep(JOB_POLL_INTERVAL)
+    st.rerun()
@@ -0,0 +1,102 @@
+"""
+Compares the sentiment backends against the fp32 PyTorch model: label
+agreement, throughput and single-review latency, on the processed reviews
+in data/*_processed.csv.
+
+Usage: python benchmarks/bench_backends.py [--limit N] [--backends torch-int8,onnx] [--batch-size 32]
+"""
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mypipeline.backends import BACKENDS
+from mypipeline.inference import DEFAULT_BATCH_SIZE, BatchedSentimentEngine
+from mypipeline.model_registry import get_model
+from mypipeline.sentiment_analysis import MODEL_NAME
+
+LATENCY_SAMPLES = 50
+
+
+def load_texts(limit=None):
+    texts = {}
+    for path in sorted(glob.glob(os.path.join("data", "*_processed.csv"))):
+        column = pd.read_csv(path, usecols=["processed_text"])["processed_text"].dropna()
+        texts[os.path.basename(path)] = column.head(limit).tolist() if limit else column.tolist()
+    return texts
+
+
+def run_backend(backend, texts, batch_size):
+    handle = get_model(MODEL_NAME, backend=backend)
+    engine = BatchedSentimentEngine(handle.tokenizer, handle.model, batch_size=batch_size)
+
+    labels, seconds = {}, 0.0
+    for name, file_texts in texts.items():
+        start = time.perf_counter()
+        labels[name] = engine.predict(file_texts)
+        seconds += time.perf_counter() - start
+
+    # Latency of scoring one review at a time, as an interactive caller would
+    sample = [text for file_texts in texts.values() for text in file_texts][:LATENCY_SAMPLES]
+    latencies = []
+    for text in sample:
+        start = time.perf_counter()
+        engine.predict([text])
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        "labels": labels,
+        "load_seconds": handle.load_seconds,
+        "rows_per_sec": sum(map(len, texts.values())) / seconds if seconds else float("inf"),
+        "p50_ms": statistics.median(latencies) if latencies else float("nan"),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] if latencies else float("nan"),
+    }
+
+
+def agreement(reference, candidate):
+    pairs = [(a, b) for a, b in zip(reference, candidate) if a is not None and b is not None]
+    return sum(a == b for a, b in pairs) / len(pairs) * 100 if pairs else float("nan")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--limit", type=int, default=None, help="reviews per file (default: all)")
+    parser.add_argument("--backends", default=",".join(b for b in BACKENDS if b != "torch"))
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    texts = load_texts(args.limit)
+    if not texts:
+        print("No data/*_processed.csv files found.")
+        return 1
+    print(f"Files: {', '.join(f'{name} ({len(t)})' for name, t in texts.items())}")
+
+    backends = ["torch"] + [b for b in args.backends.split(",") if b and b != "torch"]
+    results = {backend: run_backend(backend, texts, args.batch_size) for backend in backends}
+    reference = results["torch"]
+
+    print(f"\n{'backend':<12} {'load s':>7} {'rows/sec':>9} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8}  agreement with fp32")
+    for backend, result in results.items():
+        per_file = ", ".join(
+            f"{name} {agreement(reference['labels'][name], labels):.2f}%" for name, labels in result["labels"].items()
+        )
+        overall = agreement(
+            [l for name in texts for l in reference["labels"][name]],
+            [l for name in texts for l in result["labels"][name]],
+        )
+        print(
+            f"{backend:<12} {result['load_seconds']:>7.1f} {result['rows_per_sec']:>9.1f} "
+            f"{result['rows_per_sec'] / reference['rows_per_sec']:>7.2f}x {result['p50_ms']:>8.1f} "
+            f"{result['p95_ms']:>8.1f}  {overall:.2f}% ({per_file})"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
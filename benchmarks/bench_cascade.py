@@ -0,0 +1,83 @@
+"""
+Reports how the sentiment cascade (mypipeline.cascade) trades model calls
+for agreement: for each confidence threshold, the share of rows the
+rating/lexicon first stage labels on its own, how often those labels match
+the full model's, and the agreement of the cascade's output as a whole
+(rows sent to the model get the model's own label).
+
+The full-model labels are the sentiment column of
+data/*_processed_with_sentiment.csv, so no model is loaded.
+
+Usage: python benchmarks/bench_cascade.py [--thresholds 0.5,0.6,0.7,0.75,0.8,0.9]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mypipeline.cascade import DEFAULT_CASCADE_THRESHOLD, first_stage
+
+DEFAULT_THRESHOLDS = "0.5,0.6,0.7,0.75,0.8,0.85,0.9"
+
+
+def load_labelled(pattern=os.path.join("data", "*_processed_with_sentiment.csv")):
+    datasets = {}
+    for path in sorted(glob.glob(pattern)):
+        df = pd.read_csv(path, usecols=["rating", "processed_text", "sentiment"])
+        datasets[os.path.basename(path)] = df[df["processed_text"].notna() & df["sentiment"].notna()]
+    return datasets
+
+
+def sweep(df, thresholds):
+    """
+    Returns one row per threshold with the share of rows labelled by the
+    first stage, its agreement on them and the cascade's overall agreement.
+    """
+    start = time.perf_counter()
+    labels, confidences = first_stage(df["rating"].tolist(), df["processed_text"].tolist())
+    seconds = time.perf_counter() - start
+    matches = np.array(labels) == df["sentiment"].to_numpy()
+
+    rows = []
+    for threshold in thresholds:
+        confident = confidences >= threshold
+        rows.append({
+            "threshold": threshold,
+            "first_stage_share": confident.mean() * 100,
+            "first_stage_agreement": matches[confident].mean() * 100 if confident.any() else float("nan"),
+            "agreement": (matches | ~confident).mean() * 100,
+        })
+    return rows, len(df) / seconds if seconds else float("inf")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS)
+    args = parser.parse_args(argv)
+
+    datasets = load_labelled()
+    if not datasets:
+        print("No data/*_processed_with_sentiment.csv files found.")
+        return 1
+    thresholds = [float(threshold) for threshold in args.thresholds.split(",") if threshold]
+    datasets["all"] = pd.concat(datasets.values(), ignore_index=True)
+
+    for name, df in datasets.items():
+        rows, rows_per_sec = sweep(df, thresholds)
+        print(f"\n{name}: {len(df)} rows, first stage {rows_per_sec:,.0f} rows/sec")
+        print(f"{'threshold':>9} {'to first stage':>14} {'to model':>9} {'first-stage agreement':>22} {'agreement':>10}")
+        for row in rows:
+            marker = "  (default)" if row["threshold"] == DEFAULT_CASCADE_THRESHOLD else ""
+            print(f"{row['threshold']:>9.2f} {row['first_stage_share']:>13.1f}% {100 - row['first_stage_share']:>8.1f}% "
+                  f"{row['first_stage_agreement']:>21.2f}% {row['agreement']:>9.2f}%{marker}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Measures what importing the pipeline costs a fresh interpreter, i.e. what
+app.py pays at Streamlit startup before drawing anything.
+
+Usage: python benchmarks/bench_import_time.py [--before GIT_REF] [--repeat N]
+
+With --before, the same imports are also timed in a checkout of GIT_REF
+(e.g. the commit before lazy imports) for a before/after comparison.
+"""
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+
+def app_imports(cwd):
+    # Every module-level import in the checkout's app.py, so the case follows
+    # app.py as it changes (its st.set_page_config call and the rest of the page are left out)
+    with open(os.path.join(cwd, "app.py"), encoding="utf-8") as f:
+        source = f.read()
+    return "\n".join(
+        ast.get_source_segment(source, node)
+        for node in ast.parse(source).body if isinstance(node, (ast.Import, ast.ImportFrom))
+    )
+
+
+# Statements to time, or functions returning the statement for a checkout
+CASES = {
+    "import mypipeline": "import mypipeline",
+    "app.py startup imports": app_imports,
+    "first pipeline use (all stages)": (
+        "import mypipeline.scrapper, mypipeline.preprocessing, "
+        "mypipeline.sentiment_analysis, mypipeline.theme_detection"
+    ),
+}
+
+HEAVY_MODULES = ["torch", "transformers", "nltk", "bs4", "dateparser", "streamlit", "pycountry"]
+
+
+def time_import(statement, cwd, repeat):
+    # Report which heavy modules the statement dragged in alongside the timing
+    probe = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"{statement}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(elapsed, ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    timings, loaded = [], ""
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", probe], cwd=cwd, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        elapsed, _, loaded = result.stdout.strip().splitlines()[-1].partition(" ")
+        timings.append(float(elapsed))
+    return statistics.median(timings), loaded
+
+
+def checkout(ref, directory):
+    archive = subprocess.run(
+        ["git", "archive", ref], cwd=REPO_ROOT, capture_output=True, check=True
+    ).stdout
+    archive_path = os.path.join(directory, "tree.tar")
+    with open(archive_path, "wb") as f:
+        f.write(archive)
+    with tarfile.open(archive_path) as tar:
+        tar.extractall(directory)
+    return directory
+
+
+def report(label, cwd, repeat):
+    print(f"\n{label}")
+    for name, statement in CASES.items():
+        if callable(statement):
+            statement = statement(cwd)
+        seconds, detail = time_import(statement, cwd, repeat)
+        if seconds is None:
+            print(f"  {name:<34} failed: {detail}")
+        else:
+            print(f"  {name:<34} {seconds * 1000:8.0f} ms  heavy: {detail or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--before", help="git ref to compare against")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.before:
+        with tempfile.TemporaryDirectory() as directory:
+            report(f"before ({args.before})", checkout(args.before, directory), args.repeat)
+    report("after (working tree)", REPO_ROOT, args.repeat)
+    print(f"\nDone in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
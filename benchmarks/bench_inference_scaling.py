@@ -0,0 +1,143 @@
+"""
+Measures how sentiment throughput scales with cores: for each core count
+from 1 up to all of them, every workers x threads split of those cores on
+a batch.InferencePool, plus the model in this process with that many torch
+threads. Prints rows/sec, speedup over one core and per-core efficiency,
+and the fastest split for each core count.
+
+Texts come from the synthetic corpus (benchmarks/synthetic.py), so runs on
+different machines score the same inputs. Model loads and one warm-up shard
+per worker are not timed.
+
+Usage: python benchmarks/bench_inference_scaling.py [--rows 4000] [--cores 1,2,4,8] [--backend onnx]
+                                                    [--batch-size 32] [--output PATH]
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from bench_pipeline import RESULTS_DIR, environment
+from synthetic import generate_reviews
+from mypipeline.batch import SHARD_SIZE, InferencePool
+from mypipeline.inference import DEFAULT_BATCH_SIZE, BatchedSentimentEngine, pin_threads
+from mypipeline.model_registry import evict, get_model, loaded_models
+from mypipeline.sentiment_analysis import MODEL_NAME
+
+
+def default_cores():
+    # Powers of two up to the machine's cores, and the full count itself
+    cpu_count = os.cpu_count() or 1
+    cores, count = [], 1
+    while count < cpu_count:
+        cores.append(count)
+        count *= 2
+    return cores + [cpu_count]
+
+
+def splits(cores):
+    """
+    Returns every (workers, threads) pair with workers * threads == cores.
+    """
+    return [(workers, cores // workers) for workers in range(1, cores + 1) if cores % workers == 0]
+
+
+def run_in_process(texts, threads, backend, batch_size):
+    pin_threads(threads)
+    # Reloaded for every thread count: an ONNX session keeps the thread count it was created with
+    for handle in loaded_models():
+        evict(handle.key)
+    handle = get_model(MODEL_NAME, backend=backend)
+    engine = BatchedSentimentEngine(handle.tokenizer, handle.model, batch_size=batch_size)
+    engine.predict(texts[:SHARD_SIZE])
+    start = time.perf_counter()
+    labels = engine.predict(texts)
+    return labels, time.perf_counter() - start
+
+
+def run_pool(texts, workers, threads, backend, batch_size):
+    with InferencePool(workers, model_name=MODEL_NAME, backend=backend, batch_size=batch_size,
+                       threads=threads) as pool:
+        # One shard per worker, so every worker has run the model once before timing
+        pool.predict(texts[:SHARD_SIZE * workers])
+        start = time.perf_counter()
+        labels = pool.predict(texts)
+        return labels, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=4000, help="texts scored per configuration")
+    parser.add_argument("--cores", default=None, help="core counts to try (default: 1, 2, 4, ... up to all)")
+    parser.add_argument("--backend", default=None, help="sentiment backend (default: MYPIPELINE_SENTIMENT_BACKEND or torch)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None,
+                        help="results JSON (default: benchmarks/results/inference_scaling_<time>.json)")
+    args = parser.parse_args(argv)
+
+    cores = [int(count) for count in args.cores.split(",") if count] if args.cores else default_cores()
+    texts = [review["text"] for review in generate_reviews(args.rows, seed=args.seed)]
+    results = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "rows": len(texts),
+        "backend": args.backend,
+        "batch_size": args.batch_size,
+        "runs": [],
+    }
+
+    reference_labels = None
+    for count in cores:
+        configurations = [("in-process", 1, count)] + [("pool", workers, threads) for workers, threads in splits(count)]
+        for mode, workers, threads in configurations:
+            if mode == "in-process":
+                labels, seconds = run_in_process(texts, threads, args.backend, args.batch_size)
+            else:
+                labels, seconds = run_pool(texts, workers, threads, args.backend, args.batch_size)
+            # Every split must give the same labels; a mismatch means the shards were merged out of order
+            reference_labels = reference_labels or labels
+            results["runs"].append({
+                "cores": count,
+                "mode": mode,
+                "workers": workers,
+                "threads": threads,
+                "seconds": round(seconds, 4),
+                "rows_per_sec": round(len(texts) / seconds, 1) if seconds else None,
+                "labels_match": labels == reference_labels,
+            })
+
+    base = results["runs"][0]["rows_per_sec"]
+    print(f"\n{'cores':>5} {'mode':<10} {'workers':>7} {'threads':>7} {'rows/sec':>9} {'speedup':>8} {'per core':>8}")
+    for run in results["runs"]:
+        run["speedup"] = round(run["rows_per_sec"] / base, 2) if base and run["rows_per_sec"] else None
+        efficiency = f"{run['speedup'] / run['cores']:.0%}" if run["speedup"] else "-"
+        flag = "" if run["labels_match"] else "  LABELS DIFFER"
+        print(f"{run['cores']:>5} {run['mode']:<10} {run['workers']:>7} {run['threads']:>7} "
+              f"{run['rows_per_sec']:>9.1f} {run['speedup']:>7.2f}x {efficiency:>8}{flag}")
+
+    print("\nFastest split per core count:")
+    results["best"] = []
+    for count in cores:
+        best = max((run for run in results["runs"] if run["cores"] == count), key=lambda run: run["rows_per_sec"])
+        results["best"].append(best)
+        print(f"  {count} cores: {best['mode']} {best['workers']} workers x {best['threads']} threads "
+              f"({best['rows_per_sec']:.1f} rows/sec)")
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"inference_scaling_{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+    return 0 if all(run["labels_match"] for run in results["runs"]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Benchmarks Trustpilot page extraction: the original full html.parser tree with
+find_previous against the html.parser backend of mypipeline.extraction, which
+only builds the review cards, and its lxml backend, which parses the full
+page. Dates are not parsed; that step is shared by every backend.
+
+Usage: python benchmarks/bench_parse.py [directory of saved *.html pages]
+
+Without a directory, pages are rendered from data/www_ups_com.csv.
+"""
+import glob
+import os
+import sys
+import time
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import render_trustpilot_page
+from mypipeline import extraction
+
+
+def legacy_parse_reviews(html):
+    # Extraction as scrape_page did it before the selector table, minus date parsing
+    soup = BeautifulSoup(html, "html.parser")
+    reviews = []
+    for review in soup.find_all("section", class_="styles_reviewContentwrapper__W9Vqf"):
+        rating_tag = review.find("div", class_="star-rating_starRating__sdbkn")
+        title_tag = review.find("h2", class_="typography_heading-s__RxVny")
+        text_tag = review.find("p", class_="typography_body-l__v5JLj")
+        date_tag = review.find("time")
+        country_tag = review.find_previous("div", class_="typography_body-m__k2UI7 typography_appearance-subtle__PYOVM styles_detailsIcon__ch_FY")
+        reviews.append((
+            int(rating_tag.img["alt"].split()[1]) if rating_tag and rating_tag.img else None,
+            title_tag.text.strip() if title_tag else None,
+            text_tag.text.strip() if text_tag else None,
+            date_tag.get("datetime") if date_tag else None,
+            country_tag.find("span").text.strip() if country_tag else None,
+        ))
+    return reviews
+
+
+def load_pages(directory=None, per_page=20, max_pages=50):
+    if directory:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(directory, "**", "*.html"), recursive=True)):
+            with open(path, encoding="utf-8") as f:
+                pages.append(f.read())
+        return pages
+    df = pd.read_csv(os.path.join("data", "www_ups_com.csv")).dropna()
+    rows = df.to_dict("records")
+    return [render_trustpilot_page(rows[i:i + per_page]) for i in range(0, min(len(rows), per_page * max_pages), per_page)]
+
+
+def time_parser(name, parse, pages):
+    start = time.perf_counter()
+    results = [parse(html) for html in pages]
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {elapsed:7.3f}s  {len(pages) / elapsed:8.1f} pages/sec")
+    return results
+
+
+def main(directory=None):
+    pages = load_pages(directory)
+    print(f"Pages: {len(pages)} ({sum(map(len, pages)) / len(pages) / 1024:.0f} KB avg)")
+
+    legacy = time_parser("legacy html.parser", legacy_parse_reviews, pages)
+    bs4_fast = time_parser("html.parser, card scope", extraction._parse_reviews_bs4, pages)
+    if extraction.lxml is not None:
+        lxml_fast = time_parser("lxml, full page", extraction._parse_reviews_lxml, pages)
+    else:
+        lxml_fast = None
+        print("lxml not installed; skipping the lxml backend")
+
+    expected = sum(len(rows) for rows in legacy)
+    for name, results in (("html.parser", bs4_fast), ("lxml", lxml_fast)):
+        if results is not None:
+            print(f"{name} rows: {sum(len(rows) for rows in results)} (legacy: {expected})")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,250 @@
+"""
+Times every pipeline stage end to end on synthetic corpora: scraping from a
+local Trustpilot stub, preprocessing, sentiment, themes, the join and the
+dashboard aggregates, at each requested size.
+
+Each size runs in a fresh temporary working directory, so nothing under
+data/ is read or overwritten. Results are written as JSON and, when a
+baseline file exists, compared against it stage by stage. The exit status
+is 1 if any stage got slower than the baseline by more than --tolerance
+(and by more than --min-seconds, so sub-second noise is not flagged).
+
+--sentiment stub replaces the model with a hash of each text, which times
+everything around inference without needing torch or the model download.
+
+Usage: python benchmarks/bench_pipeline.py [--sizes 1000,10000,100000] [--sentiment model|stub]
+                                           [--baseline PATH] [--save-baseline] [--output PATH]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from fixtures import render_trustpilot_page
+from synthetic import generate_reviews
+from trustpilot_stub import start_stub_server
+from mypipeline.instrumentation import peak_rss_mb
+from mypipeline.storage import count_rows
+
+DEFAULT_SIZES = "1000,10000,100000"
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "pipeline_baseline.json")
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+REVIEWS_PER_PAGE = 20
+STAGES = ("scrape", "preprocess", "sentiment", "themes", "join", "aggregate")
+
+
+class StubModel:
+    """
+    Labels each text from its hash. Stands in for the sentiment model, with
+    the model_name, revision and predict(texts) score_texts needs.
+    """
+
+    model_name = "stub"
+    revision = "stub"
+    backend = "stub"
+
+    def predict(self, texts):
+        return [f"LABEL_{zlib.crc32(text.encode('utf-8')) % 3}" for text in texts]
+
+
+def serve_corpus(site, reviews):
+    last_page = max(1, -(-len(reviews) // REVIEWS_PER_PAGE))
+
+    def render(requested_site, page):
+        if requested_site != site or not 1 <= page <= last_page:
+            return None
+        chunk = reviews[(page - 1) * REVIEWS_PER_PAGE:page * REVIEWS_PER_PAGE]
+        return render_trustpilot_page(chunk, page, last_page)
+
+    return start_stub_server(None, render=render)
+
+
+def timed(results, name, run):
+    start = time.perf_counter()
+    output_path = run()
+    seconds = time.perf_counter() - start
+    rows = count_rows(output_path)
+    results[name] = {
+        "seconds": round(seconds, 4),
+        "rows": rows,
+        "rows_per_sec": round(rows / seconds, 1) if seconds else None,
+        # Peak for the whole process so far, so it only ever grows across stages and sizes
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    print(f"  {name:<11} {seconds:8.2f}s  {rows:>8} rows")
+    return output_path
+
+
+def run_size(size, seed, handle, workers):
+    from mypipeline import aggregates, preprocessing, scrapper, sentiment_analysis, theme_detection
+
+    site = f"synthetic-{size}.example"
+    reviews = generate_reviews(size, seed=seed)
+    server, base_url = serve_corpus(site, reviews)
+
+    previous_cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    stages = {}
+    try:
+        os.chdir(workdir)
+        os.makedirs("data")
+        print(f"\n{size} reviews ({-(-size // REVIEWS_PER_PAGE)} pages) in {workdir}")
+        raw = timed(stages, "scrape", lambda: scrapper.scrape_trustpilot_reviews(
+            site, base_url=base_url, max_workers=workers, requests_per_second=0,
+        ))
+        processed = timed(stages, "preprocess", lambda: preprocessing.preprocess_reviews(raw))
+        with_sentiment = timed(stages, "sentiment", lambda: sentiment_analysis.analyze_sentiment(
+            processed, cache_path=None, inference_pool=handle,
+        ))
+        themes = timed(stages, "themes", lambda: theme_detection.detect_themes(raw))
+        joined = timed(stages, "join", lambda: theme_detection.join_themes(with_sentiment, themes))
+        timed(stages, "aggregate", lambda: aggregates.build_aggregates(joined))
+    finally:
+        os.chdir(previous_cwd)
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {"size": size, "total_seconds": round(sum(s["seconds"] for s in stages.values()), 4), "stages": stages}
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance, min_seconds=0.0):
+    """
+    Returns one row per stage and size present in both runs, with the time
+    ratio against the baseline and whether it is a regression.
+    """
+    baseline_runs = {run["size"]: run for run in baseline["runs"]}
+    rows = []
+    for run in results["runs"]:
+        previous = baseline_runs.get(run["size"])
+        if previous is None:
+            continue
+        for stage in STAGES + ("total",):
+            if stage == "total":
+                seconds, base_seconds = run["total_seconds"], previous["total_seconds"]
+            elif stage in run["stages"] and stage in previous["stages"]:
+                seconds, base_seconds = run["stages"][stage]["seconds"], previous["stages"][stage]["seconds"]
+            else:
+                continue
+            ratio = seconds / base_seconds if base_seconds else None
+            rows.append({
+                "size": run["size"],
+                "stage": stage,
+                "seconds": seconds,
+                "baseline_seconds": base_seconds,
+                "ratio": round(ratio, 3) if ratio is not None else None,
+                "regression": ratio is not None and ratio > 1 + tolerance and seconds - base_seconds > min_seconds,
+            })
+    return rows
+
+
+def print_comparison(rows, tolerance):
+    print(f"\n{'size':>8} {'stage':<11} {'seconds':>9} {'baseline':>9} {'change':>8}")
+    for row in rows:
+        change = f"{(row['ratio'] - 1) * 100:+.0f}%" if row["ratio"] is not None else "-"
+        flag = "  SLOWER" if row["regression"] else ""
+        print(f"{row['size']:>8} {row['stage']:<11} {row['seconds']:>9.2f} {row['baseline_seconds']:>9.2f} "
+              f"{change:>8}{flag}")
+    regressions = sum(row["regression"] for row in rows)
+    print(f"{regressions} stage(s) more than {tolerance:.0%} slower than the baseline")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"corpus sizes (default: {DEFAULT_SIZES})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sentiment", choices=("model", "stub"), default="model")
+    parser.add_argument("--backend", default=None, help="sentiment backend (default: MYPIPELINE_SENTIMENT_BACKEND or torch)")
+    parser.add_argument("--workers", type=int, default=8, help="scraper fetch workers")
+    parser.add_argument("--output", default=None, help="results JSON (default: benchmarks/results/pipeline_<time>.json)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="also write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before a stage is flagged")
+    parser.add_argument("--min-seconds", type=float, default=0.1, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    results = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "seed": args.seed,
+        "sentiment": args.sentiment,
+        "backend": None,
+        "model_load_seconds": None,
+        "runs": [],
+    }
+
+    if args.sentiment == "stub":
+        handle = StubModel()
+    else:
+        from mypipeline.model_registry import get_model
+        from mypipeline.sentiment_analysis import MODEL_NAME
+
+        # Loaded once up front, so the sentiment stage times inference only
+        handle = get_model(MODEL_NAME, backend=args.backend)
+        results["model_load_seconds"] = round(handle.load_seconds, 4)
+    results["backend"] = handle.backend
+
+    for size in sizes:
+        results["runs"].append(run_size(size, args.seed, handle, args.workers))
+
+    status = 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if (baseline.get("sentiment"), baseline.get("backend")) != (results["sentiment"], results["backend"]):
+            print(f"\nBaseline used sentiment={baseline.get('sentiment')} backend={baseline.get('backend')}; "
+                  f"not comparing against this run's sentiment={results['sentiment']} backend={results['backend']}.")
+        else:
+            results["baseline"] = {"path": args.baseline, "created": baseline.get("created"),
+                                   "commit": baseline.get("environment", {}).get("commit")}
+            results["comparison"] = compare(results, baseline, args.tolerance, args.min_seconds)
+            print_comparison(results["comparison"], args.tolerance)
+            status = 1 if any(row["regression"] for row in results["comparison"]) else 0
+    else:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"pipeline_{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.save_baseline:
+        baseline_results = {name: value for name, value in results.items() if name not in ("baseline", "comparison")}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline_results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        status = 0
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
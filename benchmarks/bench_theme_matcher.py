@@ -0,0 +1,51 @@
+"""
+Benchmarks the compiled theme matcher against the original per-keyword regex loop.
+
+Usage: python benchmarks/bench_theme_matcher.py [path/to/reviews.csv]
+"""
+import os
+import re
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mypipeline.theme_detection import THEME_KEYWORDS, compile_theme_patterns, match_theme
+
+DEFAULT_CSV = os.path.join("data", "www_ups_com_processed_with_sentiment.csv")
+
+
+def legacy_match_theme(text):
+    # The loop detect_themes used before the compiled matcher
+    for category, keywords in THEME_KEYWORDS.items():
+        if any(re.search(r'\b' + re.escape(kw) + r'\b', text, flags=re.I) for kw in keywords):
+            return category
+    return "No Theme Detected"
+
+
+def main(csv_path=DEFAULT_CSV):
+    df = pd.read_csv(csv_path)
+    texts = (df["text"].fillna("") + " " + df["title"].fillna("")).tolist()
+
+    start = time.perf_counter()
+    legacy = [legacy_match_theme(text) for text in texts]
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    patterns = compile_theme_patterns()
+    compiled = [match_theme(text, patterns) for text in texts]
+    compiled_seconds = time.perf_counter() - start
+
+    mismatches = sum(a != b for a, b in zip(legacy, compiled))
+    print(f"Rows:             {len(texts)}")
+    print(f"Legacy loop:      {legacy_seconds:.3f}s ({len(texts) / legacy_seconds:.0f} rows/sec)")
+    print(f"Compiled matcher: {compiled_seconds:.3f}s ({len(texts) / compiled_seconds:.0f} rows/sec, incl. compile)")
+    print(f"Speedup:          {legacy_seconds / compiled_seconds:.1f}x")
+    print(f"Mismatches:       {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,65 @@
+"""
+Renders review rows into HTML shaped like a Trustpilot review page, using the
+class names in mypipeline.extraction.SELECTORS.
+"""
+import html
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mypipeline.extraction import SELECTORS
+
+# Roughly the amount of non-review markup (navigation, scripts, sidebars) on a real page
+_PAGE_CHROME = "".join(
+    f'<div class="styles_sidebar__x{i}"><a href="/categories/{i}">Category {i}</a><span>{"lorem ipsum " * 8}</span></div>'
+    for i in range(150)
+)
+
+
+def _cls(name):
+    return SELECTORS[name][1]
+
+
+def render_review_card(review):
+    stars = int(review["rating"])
+    return (
+        f'<{SELECTORS["card"][0]} class="paper_paper__1PY90 styles_reviewCard__hcAvl">'
+        f'<aside class="styles_consumerInfoWrapper__KP3Ra"><a href="/users/1"><span>Customer</span></a>'
+        f'<div class="{_cls("country")}"><svg></svg><span>{html.escape(str(review["country"]))}</span></div></aside>'
+        f'<{SELECTORS["review"][0]} class="{_cls("review")}">'
+        f'<div class="styles_reviewHeader__iU9Px"><div class="{_cls("rating")}">'
+        f'<img alt="Rated {stars} out of 5 stars" src="/stars-{stars}.svg"/></div>'
+        f'<div class="typography_body-m__xgxZ_"><time datetime="{html.escape(str(review["date"]))}">'
+        f'{html.escape(str(review["date"]))}</time></div></div>'
+        f'<div class="styles_reviewContent__0Q2Tg"><a href="/reviews/1">'
+        f'<h2 class="{_cls("title")}">{html.escape(str(review["title"]))}</h2></a>'
+        f'<p class="{_cls("text")}">{html.escape(str(review["text"]))}</p></div>'
+        f'</{SELECTORS["review"][0]}></{SELECTORS["card"][0]}>'
+    )
+
+
+def render_trustpilot_page(reviews, page=1, last_page=1):
+    cards = "".join(render_review_card(review) for review in reviews)
+    return (
+        "<!DOCTYPE html><html><head><title>Reviews</title>"
+        f"<script>{'var x = 1;' * 500}</script></head><body>"
+        f"<header>{_PAGE_CHROME}</header><main><div class=\"styles_reviewsContainer__3_GQw\">{cards}</div>"
+        f'<nav><a name="pagination-button-last" aria-label="Last page {last_page}" href="?page={last_page}">'
+        f"{last_page}</a></nav></main><footer>{_PAGE_CHROME}</footer></body></html>"
+    )
+
+
+def write_trustpilot_pages(reviews, root, site, per_page=20):
+    """
+    Splits `reviews` into pages under <root>/<site>/page_<n>.html, the layout
+    benchmarks/trustpilot_stub.py serves. Returns the number of pages written.
+    """
+    site_dir = os.path.join(root, site)
+    os.makedirs(site_dir, exist_ok=True)
+    last_page = max(1, -(-len(reviews) // per_page))
+    for page in range(1, last_page + 1):
+        chunk = reviews[(page - 1) * per_page:page * per_page]
+        with open(os.path.join(site_dir, f"page_{page}.html"), "w", encoding="utf-8") as f:
+            f.write(render_trustpilot_page(chunk, page, last_page))
+    return last_page
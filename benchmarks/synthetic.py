@@ -0,0 +1,107 @@
+"""
+Generates synthetic review corpora shaped like the scraped CSVs
+(rating,title,text,date,country), for benchmarking without Trustpilot.
+
+Ratings and countries follow roughly the mix in data/*.csv, texts are built
+from phrases that hit every theme in THEME_KEYWORDS (plus some that hit
+none), and a share of short texts repeat, as "Great service" does in real
+data. The same size and seed always give the same corpus.
+
+Usage: python benchmarks/synthetic.py <size> [output.csv] [--seed N]
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mypipeline.theme_detection import THEME_KEYWORDS
+
+RATINGS = {1: 0.6, 2: 0.03, 3: 0.02, 4: 0.05, 5: 0.3}
+COUNTRIES = {"US": 0.5, "GB": 0.15, "AU": 0.12, "CA": 0.1, "DE": 0.03, "SE": 0.02, "ES": 0.02, "IE": 0.02,
+             "NZ": 0.02, "FR": 0.02}
+
+POSITIVE = [
+    "Great service, the parcel arrived a day early.", "Really easy to book and the pickup was on time.",
+    "Friendly staff and clear tracking all the way.", "Would happily use them again.",
+    "Good value for a next day delivery.", "The courier was polite and careful with the box.",
+]
+NEGATIVE = [
+    "I waited all day and nobody came.", "Nobody could tell me where my order was.",
+    "I have been trying to get a refund for three weeks.", "Avoid this company if you can.",
+    "The tracking page said delivered but nothing was at my door.", "I will not be using them again.",
+]
+FILLER = [
+    "I ordered a birthday present for my sister.", "We run a small online shop and ship most days.",
+    "The box contained a pair of shoes.", "It was sent from another state.", "This was my second order with them.",
+    "I checked the website several times.", "My neighbour had the same experience.",
+]
+REPEATED = ["Great service", "Excellent", "Very good", "Terrible", "Worst company ever", "Fast delivery"]
+START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+
+def _weighted(rng, weights, k):
+    return rng.choices(list(weights), weights=list(weights.values()), k=k)
+
+
+def _review_text(rng, rating):
+    sentences = rng.sample(FILLER, rng.randint(1, 3))
+    sentences += rng.sample(POSITIVE if rating >= 4 else NEGATIVE, rng.randint(1, 2))
+    # Most complaints, and a few compliments, mention something a theme matches
+    if rng.random() < (0.8 if rating <= 3 else 0.2):
+        theme = rng.choice(list(THEME_KEYWORDS))
+        sentences.append(f"The {rng.choice(THEME_KEYWORDS[theme])} part was what stood out.")
+    rng.shuffle(sentences)
+    return " ".join(sentences)
+
+
+def generate_reviews(size, seed=0, duplicate_rate=0.05):
+    """
+    Returns `size` review dicts with rating, title, text, date (ISO-8601 UTC,
+    as Trustpilot's <time datetime>) and country, newest first.
+    """
+    rng = random.Random(seed)
+    ratings = _weighted(rng, RATINGS, size)
+    countries = _weighted(rng, COUNTRIES, size)
+    # Spread over two years, newest first like Trustpilot's listing
+    offsets = sorted((rng.randint(0, 2 * 365 * 24 * 3600) for _ in range(size)), reverse=True)
+
+    reviews = []
+    for rating, country, offset in zip(ratings, countries, offsets):
+        if rng.random() < duplicate_rate:
+            text = rng.choice(REPEATED)
+            title = text
+        else:
+            text = _review_text(rng, rating)
+            title = text.split(".")[0][:60]
+        date = START + timedelta(seconds=offset)
+        reviews.append({
+            "rating": rating,
+            "title": title,
+            "text": text,
+            "date": date.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "country": country,
+        })
+    return reviews
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("size", type=int)
+    parser.add_argument("output", nargs="?", default=None, help="CSV path (default: data/synthetic_<size>.csv)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.join("data", f"synthetic_{args.size}.csv")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    pd.DataFrame(generate_reviews(args.size, seed=args.seed)).to_csv(output, index=False)
+    print(f"Wrote {args.size} reviews to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
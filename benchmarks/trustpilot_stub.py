@@ -0,0 +1,78 @@
+"""
+Local stand-in for Trustpilot that serves saved review pages from disk.
+
+Pages are looked up as <root>/<site>/page_<n>.html, so
+http://127.0.0.1:<port>/review/sendle.com?page=3 serves <root>/sendle.com/page_3.html.
+Point the scraper at it with scrape_trustpilot_reviews(site, base_url=...).
+Pass `render` to serve pages generated on request instead of from disk.
+
+Usage: python benchmarks/trustpilot_stub.py <root> [port]
+"""
+import hashlib
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+def read_page(root, site, page):
+    path = os.path.join(root, site, f"page_{page}.html")
+    if not os.path.isfile(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def make_handler(root, render=None):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            site = parts.path.rstrip("/").split("/")[-1]
+            page = parse_qs(parts.query).get("page", ["1"])[0]
+            body = None
+            if parts.path.startswith("/review/") and page.isdigit():
+                body = render(site, int(page)) if render else read_page(root, site, page)
+            if body is None:
+                self.send_error(404)
+                return
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+            # Pages carry an ETag, so a conditional refetch of an unchanged page gets a 304
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def start_stub_server(root, port=0, render=None):
+    """
+    Starts the stub in a background thread and returns (server, base_url).
+    `render(site, page)`, if given, returns each page's HTML (or None for a
+    404) in place of reading it from `root`. Call server.shutdown() when done.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(root, render))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/review/"
+
+
+if __name__ == "__main__":
+    server, base_url = start_stub_server(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 8000)
+    print(f"Serving {sys.argv[1]} at {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
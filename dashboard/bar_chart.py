@@ -1,41 +1,50 @@
 import streamlit as st
 import plotly.express as px
 
-def render_bar_chart(df):
+from mypipeline.aggregates import theme_counts as cube_theme_counts
+
+def render_bar_chart(cube, theme_hits=None):
     """
     Renders a bar chart for theme distribution using Plotly.
 
     Args:
-        df (pd.DataFrame): The DataFrame containing theme data.
+        cube (pd.DataFrame): The aggregate cube of review counts (see mypipeline.aggregates).
+        theme_hits (pd.DataFrame, optional): Long-format (row, theme, hits) theme
+            hit counts. When given, each review is counted under every theme it
+            mentions instead of only its primary theme.
 
     Returns:
         plotly.graph_objs._figure.Figure: The Plotly figure object for the bar chart.
     """
-    if df is not None and "theme" in df.columns:
-        # Calculate theme counts
-        theme_counts = df["theme"].value_counts().reset_index()
+    if theme_hits is not None:
+        # Multi-label counts: number of reviews mentioning each theme
+        theme_counts = theme_hits["theme"].value_counts()
+        theme_counts = theme_counts[theme_counts > 0].reset_index()
         theme_counts.columns = ["Theme", "Count"]
+    elif cube is not None and "theme" in cube.columns:
+        # Calculate theme counts
+        theme_counts = cube_theme_counts(cube)
+    else:
+        st.warning("No theme data found to render the bar chart.")
+        return None
 
-        # Create a bar chart using Plotly
-        fig_bar = px.bar(
-            theme_counts, 
-            x="Theme", 
-            y="Count", 
-            title="Theme Distribution",
-            labels={"Count": "Number of Occurrences", "Theme": "Themes"},
-            color="Theme",  # Use the 'Theme' column for coloring
-            color_discrete_sequence=px.colors.qualitative.Pastel  # Use a professional color palette
-        )
+    # Create a bar chart using Plotly
+    fig_bar = px.bar(
+        theme_counts, 
+        x="Theme", 
+        y="Count", 
+        title="Theme Distribution",
+        labels={"Count": "Number of Occurrences", "Theme": "Themes"},
+        color="Theme",  # Use the 'Theme' column for coloring
+        color_discrete_sequence=px.colors.qualitative.Pastel  # Use a professional color palette
+    )
 
-        # Update layout for a cleaner look
-        fig_bar.update_layout(
-            xaxis_title="Themes",
-            yaxis_title="Number of Occurrences",
-            showlegend=False,  # Hide legend for simplicity
-            font=dict(size=14)  # Increase font size for better readability
-        )
+    # Update layout for a cleaner look
+    fig_bar.update_layout(
+        xaxis_title="Themes",
+        yaxis_title="Number of Occurrences",
+        showlegend=False,  # Hide legend for simplicity
+        font=dict(size=14)  # Increase font size for better readability
+    )
 
-        return fig_bar
-    else:
-        st.warning("No theme data found to render the bar chart.")
-        return None
\ No newline at end of file
+    return fig_bar
@@ -0,0 +1,87 @@
+import pandas as pd
+import plotly.express as px
+
+SENTIMENT_COLORS = {
+    "NEGATIVE": "#FF6B6B",  # Soft red
+    "NEUTRAL": "#FFD166",   # Soft yellow/orange
+    "POSITIVE": "#4CAF50"   # Soft green
+}
+
+
+def month_range_filters(start_month, end_month):
+    """
+    Converts an inclusive range of months into the store's start/end filters.
+
+    Args:
+        start_month (str): First month, as "YYYY-MM".
+        end_month (str): Last month, as "YYYY-MM".
+
+    Returns:
+        dict: {"start": first day of start_month, "end": first day after end_month}.
+    """
+    return {
+        "start": pd.Period(start_month, "M").start_time,
+        "end": (pd.Period(end_month, "M") + 1).start_time,
+    }
+
+
+def site_summary(by_sentiment):
+    """
+    Summarizes each site's reviews and sentiment shares.
+
+    Args:
+        by_sentiment (pd.DataFrame): (site, sentiment, reviews) counts from ReviewStore.counts.
+
+    Returns:
+        pd.DataFrame: One row per site with its review count and % of each sentiment.
+    """
+    shares = by_sentiment.pivot_table(index="site", columns="sentiment", values="reviews", aggfunc="sum", fill_value=0)
+    summary = pd.DataFrame({"Reviews": shares.sum(axis=1)})
+    for sentiment in shares.columns:
+        summary[f"% {sentiment.title()}"] = (shares[sentiment] / summary["Reviews"] * 100).round(1)
+    return summary.rename_axis("Site").reset_index()
+
+
+def render_sentiment_by_site(by_sentiment):
+    """
+    Renders each site's sentiment mix as 100% stacked bars.
+
+    Args:
+        by_sentiment (pd.DataFrame): (site, sentiment, reviews) counts from ReviewStore.counts.
+
+    Returns:
+        plotly.graph_objs._figure.Figure: The Plotly figure object for the bar chart.
+    """
+    fig = px.bar(
+        by_sentiment,
+        x="site",
+        y="reviews",
+        color="sentiment",
+        title="Sentiment by Site",
+        labels={"site": "Site", "reviews": "Share of Reviews", "sentiment": "Sentiment"},
+        color_discrete_map=SENTIMENT_COLORS,
+    )
+    fig.update_layout(barnorm="percent", yaxis_ticksuffix="%")
+    return fig
+
+
+def render_monthly_reviews_by_site(by_month):
+    """
+    Renders a line per site of reviews per month.
+
+    Args:
+        by_month (pd.DataFrame): (site, month, reviews) counts from ReviewStore.counts.
+
+    Returns:
+        plotly.graph_objs._figure.Figure: The Plotly figure object for the line chart.
+    """
+    fig = px.line(
+        by_month.dropna(subset=["month"]),
+        x="month",
+        y="reviews",
+        color="site",
+        markers=True,
+        title="Reviews per Month by Site",
+        labels={"month": "Month", "reviews": "Number of Reviews", "site": "Site"},
+    )
+    return fig
@@ -0,0 +1,98 @@
+import os
+from functools import lru_cache
+
+import pandas as pd
+import pycountry
+import streamlit as st
+
+from mypipeline.aggregates import cube_path, hours_path
+from mypipeline.storage import read_artifact
+from mypipeline.theme_detection import load_theme_hits, theme_hits_path
+
+
+def file_fingerprint(path):
+    """
+    Identifies the current contents of a results file for cache keys.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        tuple: (modification time in ns, size in bytes), or None if the file does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+@lru_cache(maxsize=None)
+def country_name(code):
+    """
+    Resolves an ISO alpha-2 country code to its name.
+
+    Args:
+        code (str): The country code, e.g. "AU".
+
+    Returns:
+        str: The country name, or the code itself if pycountry does not know it.
+    """
+    if not isinstance(code, str):
+        return code
+    country = pycountry.countries.get(alpha_2=code)
+    return country.name if country else code
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def load_cube(path, fingerprint):
+    """
+    Loads the aggregate cube written by the pipeline's aggregate stage.
+
+    `month` is parsed into a datetime column and `country_name` is resolved
+    once per distinct country code. The DataFrame is shared across reruns and
+    sessions, so callers must not modify it.
+
+    Args:
+        path (str): Path to the results artifact the cube was built from.
+        fingerprint (tuple): file_fingerprint of the cube; a new value reloads it.
+
+    Returns:
+        pd.DataFrame: Review counts by month, country, sentiment, theme and rating.
+    """
+    cube = read_artifact(cube_path(path), memory_map=True)
+    cube["month"] = pd.to_datetime(cube["month"])
+    names = {code: country_name(code) for code in cube["country"].dropna().unique()}
+    cube["country_name"] = cube["country"].map(names)
+    return cube
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def load_hours(path, fingerprint):
+    """
+    Loads review counts by hour of day.
+
+    Args:
+        path (str): Path to the results artifact the counts were built from.
+        fingerprint (tuple): file_fingerprint of the hours table.
+
+    Returns:
+        pd.DataFrame: (hour, reviews) counts.
+    """
+    return read_artifact(hours_path(path))
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def load_results_theme_hits(path, fingerprint):
+    """
+    Loads the multi-label theme hit counts saved next to the results, if any.
+
+    Args:
+        path (str): Path to the results artifact.
+        fingerprint (tuple): file_fingerprint of the hits file; None if it does not exist.
+
+    Returns:
+        pd.DataFrame or None: Long-format (row, theme, hits) counts.
+    """
+    if fingerprint is None:
+        return None
+    return load_theme_hits(theme_hits_path(path), memory_map=True)
@@ -1,21 +1,21 @@
 import streamlit as st
 import plotly.express as px
 
-def render_pie_chart(df):
+from mypipeline.aggregates import sentiment_percentages
+
+def render_pie_chart(cube):
     """
     Renders a pie chart for sentiment distribution using Plotly.
 
     Args:
-        df (pd.DataFrame): The DataFrame containing sentiment data.
+        cube (pd.DataFrame): The aggregate cube of review counts (see mypipeline.aggregates).
 
     Returns:
         plotly.graph_objs._figure.Figure: The Plotly figure object for the pie chart.
     """
-    if df is not None and "sentiment" in df.columns:
+    if cube is not None and "sentiment" in cube.columns:
         # Calculate sentiment percentages
-        sentiment_counts = df["sentiment"].value_counts(normalize=True) * 100
-        pie_chart_data = sentiment_counts.reset_index()
-        pie_chart_data.columns = ["Sentiment", "Percentage"]
+        pie_chart_data = sentiment_percentages(cube)
 
         # Define custom colors for the pie chart
         color_map = {
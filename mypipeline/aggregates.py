@@ -0,0 +1,131 @@
+"""
+Aggregate tables the dashboard renders from, so charts never group over
+(or even load) row-level reviews.
+
+The cube holds review counts by month x country x sentiment x theme x rating;
+the hours table holds review counts by hour of day. Both are updated from
+the rows appended to the results since they were last built.
+"""
+import os
+
+import pandas as pd
+
+from .dates import normalize_dates
+from .storage import artifact_exists, artifact_path, count_rows, read_artifact, write_artifact
+
+CUBE_DIMENSIONS = ["month", "country", "sentiment", "theme", "rating"]
+
+
+def cube_path(results_path):
+    return artifact_path(results_path, "_cube")
+
+
+def hours_path(results_path):
+    return artifact_path(results_path, "_hours")
+
+
+def pie_chart_path(results_path):
+    return artifact_path(results_path, "_pie_chart")
+
+
+def bar_chart_path(results_path):
+    return artifact_path(results_path, "_bar_chart")
+
+
+def _sum_by(df, dimensions):
+    # NaN months/countries are kept as their own group so every row is counted
+    return df.groupby(dimensions, dropna=False, observed=True, sort=True)["reviews"].sum().reset_index()
+
+
+def result_dates(df):
+    """
+    Returns the UTC review dates of result rows, from date_utc where present.
+    """
+    if "date_utc" in df.columns:
+        dates = pd.to_datetime(df["date_utc"], utc=True)
+        # Rows written before date_utc existed only have the date string
+        missing = dates.isna()
+        if missing.any():
+            dates[missing] = normalize_dates(df["date"][missing], record=False).to_numpy()
+    else:
+        dates = normalize_dates(df["date"], record=False).set_axis(df.index)
+    return dates
+
+
+def aggregate(df):
+    """
+    Returns (cube, hours) counts for result rows with date_utc (or date),
+    country, sentiment, theme and rating columns. Months and hours are in UTC.
+    """
+    dates = result_dates(df).dt.tz_localize(None)
+    rows = df[CUBE_DIMENSIONS[1:]].assign(
+        month=dates.dt.to_period("M").dt.to_timestamp(), hour=dates.dt.hour, reviews=1
+    )
+    return _sum_by(rows, CUBE_DIMENSIONS), _sum_by(rows, ["hour"])
+
+
+def _merge(previous, new, dimensions):
+    if previous is None:
+        return new
+    return _sum_by(pd.concat([previous, new], ignore_index=True), dimensions)
+
+
+def sentiment_percentages(cube):
+    counts = cube.groupby("sentiment", observed=True)["reviews"].sum()
+    percentages = (counts / counts.sum() * 100).reset_index()
+    percentages.columns = ["Sentiment", "Percentage"]
+    return percentages
+
+
+def theme_counts(cube):
+    counts = cube[cube["theme"] != "No Theme Detected"].groupby("theme", observed=True)["reviews"].sum()
+    counts = counts[counts > 0].sort_values(ascending=False, kind="stable").reset_index()
+    counts.columns = ["Theme", "Count"]
+    return counts
+
+
+def build_aggregates(results_path, incremental=False, overwrite=False):
+    """
+    Builds the cube and hours tables for `results_path` and returns the cube path.
+
+    Results only ever grow by appending rows, so in incremental mode the rows
+    already counted (the total of the hours table) are skipped and the rest
+    are added to the existing counts.
+    """
+    output_path = cube_path(results_path)
+    hours_output_path = hours_path(results_path)
+
+    has_output = artifact_exists(output_path) and artifact_exists(hours_output_path) and not overwrite
+    if has_output and not incremental and os.path.getmtime(output_path) >= os.path.getmtime(results_path):
+        print(f"{output_path} is up to date. Skipping aggregation.")
+        return output_path
+
+    cube, hours, counted = None, None, 0
+    if has_output and incremental:
+        hours = read_artifact(hours_output_path)
+        counted = int(hours["reviews"].sum())
+        total = count_rows(results_path)
+        if counted == total:
+            print(f"{output_path} is up to date.")
+            return output_path
+        if counted > total:
+            # The results were rebuilt rather than appended to; count from scratch
+            hours, counted = None, 0
+        else:
+            cube = read_artifact(output_path)
+            cube["month"] = pd.to_datetime(cube["month"])
+
+    df = read_artifact(results_path, columns=["date", "date_utc"] + CUBE_DIMENSIONS[1:]).iloc[counted:]
+    new_cube, new_hours = aggregate(df)
+    cube = _merge(cube, new_cube, CUBE_DIMENSIONS)
+    hours = _merge(hours, new_hours, ["hour"])
+
+    write_artifact(cube, output_path)
+    write_artifact(hours, hours_output_path)
+
+    # Chart data for the dashboard, next to the results it was computed from
+    write_artifact(sentiment_percentages(cube), pie_chart_path(results_path))
+    write_artifact(theme_counts(cube), bar_chart_path(results_path))
+
+    print(f"Aggregated {len(df)} rows into {len(cube)} cube cells at {output_path}")
+    return output_path
@@ -0,0 +1,122 @@
+"""
+CPU inference backends for the sentiment model.
+
+- "torch": the model as loaded from the Hub.
+- "torch-int8": Linear layers dynamically quantized to int8.
+- "onnx": the model exported once to ONNX (cached under models/) and run
+  with ONNX Runtime.
+
+The backend is picked per call, or for the whole process with
+MYPIPELINE_SENTIMENT_BACKEND.
+"""
+import inspect
+import os
+
+# Selects the sentiment backend when none is passed explicitly
+SENTIMENT_BACKEND_ENV = "MYPIPELINE_SENTIMENT_BACKEND"
+
+BACKENDS = ("torch", "torch-int8", "onnx")
+DEFAULT_EXPORT_DIR = "models"
+ONNX_OPSET = 17
+
+
+def default_backend():
+    backend = os.environ.get(SENTIMENT_BACKEND_ENV) or "torch"
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown sentiment backend '{backend}'. Expected one of {sorted(BACKENDS)}")
+    return backend
+
+
+def onnx_path(model_name, revision, export_dir=DEFAULT_EXPORT_DIR):
+    return os.path.join(export_dir, f"{model_name.replace('/', '__')}-{revision or 'unknown'}.onnx")
+
+
+def quantize_int8(model):
+    import torch
+
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def export_onnx(model, tokenizer, path):
+    """
+    Exports a sequence-classification model to ONNX with dynamic batch and
+    sequence axes. Written to a temporary file first, so a crash never
+    leaves a truncated export behind.
+    """
+    import torch
+
+    names = ["input_ids", "attention_mask"]
+    sample = tokenizer(["An example review."], return_tensors="pt")
+    options = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        # no_grad, not inference_mode: the exporter's tracer cannot use inference tensors in some torch versions
+        with torch.no_grad():
+            torch.onnx.export(
+                model, (sample["input_ids"], sample["attention_mask"]), tmp_path,
+                input_names=names, output_names=["logits"],
+                dynamic_axes={name: {0: "batch", 1: "sequence"} for name in names + ["logits"]},
+                opset_version=ONNX_OPSET, **options,
+            )
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+class _Output:
+    def __init__(self, logits):
+        self.logits = logits
+
+
+class OnnxSequenceClassifier:
+    """
+    Runs an exported model with ONNX Runtime behind the small part of the
+    transformers model interface BatchedSentimentEngine uses: `config`,
+    `device`, and calling it with tokenizer tensors to get `.logits`.
+    """
+
+    device = "cpu"
+
+    def __init__(self, path, config):
+        import onnxruntime
+        import torch
+
+        self.path = path
+        self.config = config
+        # As many threads as torch uses, so pin_threads covers this backend too
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = torch.get_num_threads()
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self._input_names = [i.name for i in self.session.get_inputs()]
+        self.size_bytes = os.path.getsize(path)
+
+    def parameters(self):
+        return []
+
+    def __call__(self, **inputs):
+        import torch
+
+        feed = {name: inputs[name].cpu().numpy() for name in self._input_names}
+        (logits,) = self.session.run(["logits"], feed)
+        return _Output(torch.from_numpy(logits))
+
+
+def load_onnx(model_name, tokenizer, export_dir=DEFAULT_EXPORT_DIR):
+    """
+    Returns an OnnxSequenceClassifier for `model_name`, exporting it first if
+    this revision has not been exported yet.
+    """
+    from transformers import AutoConfig, AutoModelForSequenceClassification
+
+    config = AutoConfig.from_pretrained(model_name)
+    path = onnx_path(model_name, getattr(config, "_commit_hash", None), export_dir)
+    if not os.path.exists(path):
+        print(f"Exporting {model_name} to {path} (once per model revision)...")
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        model.eval()
+        export_onnx(model, tokenizer, path)
+    return OnnxSequenceClassifier(path, config)
@@ -0,0 +1,187 @@
+"""
+Runs the pipeline for many sites at once.
+
+Sites run concurrently on threads, since their scraping is I/O bound.
+Sentiment inference for every site goes to one InferencePool: a fixed set
+of worker processes that each load the model once, so N sites never mean N
+model loads. A site that fails is reported in the summary and does not stop
+the others.
+
+The same pool gives a single run data-parallel inference
+(run_full_pipeline(..., inference_workers=N)). Each worker pins torch to
+its share of the cores, so N workers never start N x cpu_count intra-op
+threads between them; benchmarks/bench_inference_scaling.py measures which
+workers x threads split is fastest on a machine.
+"""
+import collections
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .backends import default_backend
+from .inference import DEFAULT_BATCH_SIZE, pin_threads
+from .instrumentation import emit, using_sinks
+from .model_registry import DEFAULT_MODEL_NAME
+
+# Texts sent to an inference worker per task
+SHARD_SIZE = 256
+
+# Shards queued per worker ahead of the one it is scoring
+SHARDS_AHEAD = 2
+
+_worker_handle = None
+_worker_batch_size = DEFAULT_BATCH_SIZE
+
+
+def threads_per_worker(workers):
+    # An even share of the cores, so the workers together never oversubscribe them
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def _load_worker_model(model_name, device, dtype, backend, batch_size, threads):
+    global _worker_handle, _worker_batch_size
+    from .model_registry import get_model
+
+    # Before the model load, the first thing in a spawned worker to import torch
+    pin_threads(threads)
+
+    _worker_handle = get_model(model_name, device=device, dtype=dtype, backend=backend)
+    _worker_batch_size = batch_size
+
+
+def _worker_revision():
+    return _worker_handle.revision
+
+
+def _predict_in_worker(texts):
+    from .inference import BatchedSentimentEngine
+
+    engine = BatchedSentimentEngine(_worker_handle.tokenizer, _worker_handle.model, batch_size=_worker_batch_size)
+    return engine.predict(texts)
+
+
+class InferencePool:
+    """
+    Worker processes that each hold one copy of the sentiment model.
+
+    Has the model_name, revision and predict(texts) that
+    sentiment_analysis.score_texts needs, so it can stand in for a
+    ModelHandle; concurrent callers share the workers. Each worker runs
+    torch with `threads` intra-op threads (by default an even share of the
+    cores).
+    """
+
+    def __init__(self, workers=2, model_name=DEFAULT_MODEL_NAME, device="cpu", dtype="float32", backend=None,
+                 batch_size=DEFAULT_BATCH_SIZE, threads=None):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.model_name = model_name
+        self.device = device
+        self.dtype = dtype
+        self.backend = backend or default_backend()
+        self.workers = workers
+        self.threads = threads or threads_per_worker(workers)
+        # Spawned rather than forked: the parent is running site threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load_worker_model,
+            initargs=(model_name, device, dtype, self.backend, batch_size, self.threads),
+        )
+        self.revision = self._executor.submit(_worker_revision).result()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown()
+
+    def predict(self, texts):
+        """
+        Returns a label per text, in input order. Texts are sent to the
+        workers in SHARD_SIZE shards as they are read from `texts`, with at
+        most SHARDS_AHEAD shards per worker waiting, and labels are collected
+        shard by shard in the order the shards were sent.
+        """
+        start = time.perf_counter()
+        pending = collections.deque()
+        labels = []
+        shard = []
+        for text in texts:
+            shard.append(text)
+            if len(shard) == SHARD_SIZE:
+                pending.append(self._executor.submit(_predict_in_worker, shard))
+                shard = []
+                if len(pending) > self.workers * SHARDS_AHEAD:
+                    labels.extend(pending.popleft().result())
+        if shard:
+            pending.append(self._executor.submit(_predict_in_worker, shard))
+        while pending:
+            labels.extend(pending.popleft().result())
+
+        elapsed = time.perf_counter() - start
+        rows_per_sec = len(labels) / elapsed if elapsed > 0 else float("inf")
+        print(f"Scored {len(labels)} rows on {self.workers} workers x {self.threads} threads in {elapsed:.2f}s "
+              f"({rows_per_sec:.1f} rows/sec)")
+        emit("rows", stage="sentiment", rows=len(labels), seconds=elapsed, rows_per_sec=rows_per_sec,
+             workers=self.workers, threads=self.threads)
+        return labels
+
+
+def _run_site(site_to_review, inference_pool, multi_label_themes, incremental):
+    from .pipeline import run_full_pipeline
+    from .storage import count_rows
+
+    start = time.perf_counter()
+    summary = {"site": site_to_review, "status": "ok", "rows": None, "output": None, "error": None}
+    timings = {}
+
+    def record_timing(event):
+        if event.kind == "stage_end" and event.fields.get("run") == site_to_review:
+            timings[event.fields["stage"]] = event.fields["seconds"]
+
+    try:
+        with using_sinks(record_timing):
+            final_path = run_full_pipeline(site_to_review, multi_label_themes=multi_label_themes,
+                                           incremental=incremental, inference_pool=inference_pool)
+        summary.update(rows=count_rows(final_path), output=final_path)
+    except Exception as error:
+        print(f"{site_to_review} failed: {error!r}")
+        summary.update(status="failed", error=repr(error))
+    summary["seconds"] = time.perf_counter() - start
+    summary["stages"] = timings
+    emit("site_end", site=site_to_review, status=summary["status"], seconds=summary["seconds"], rows=summary["rows"])
+    return summary
+
+
+def print_summary(summaries):
+    print(f"\n{'site':<30} {'status':<8} {'rows':>8} {'seconds':>9}  stages")
+    for summary in summaries:
+        rows = "-" if summary["rows"] is None else summary["rows"]
+        stages = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in summary["stages"].items())
+        print(f"{summary['site']:<30} {summary['status']:<8} {rows:>8} {summary['seconds']:>9.1f}  {stages}")
+        if summary["error"]:
+            print(f"{'':<30} {summary['error']}")
+
+
+def run_batch(sites, site_workers=4, inference_workers=2, multi_label_themes=False, incremental=False,
+              model_name=DEFAULT_MODEL_NAME, device="cpu", dtype="float32", backend=None, batch_size=DEFAULT_BATCH_SIZE,
+              inference_threads=None):
+    """
+    Runs the pipeline for every site in `sites` and returns one summary dict
+    per site (in input order) with its status, row count, output path and
+    total and per-stage timings.
+    """
+    sites = list(dict.fromkeys(sites))
+    with InferencePool(inference_workers, model_name=model_name, device=device, dtype=dtype, backend=backend,
+                       batch_size=batch_size, threads=inference_threads) as inference_pool:
+        with ThreadPoolExecutor(max_workers=site_workers) as executor:
+            summaries = list(executor.map(
+                lambda site: _run_site(site, inference_pool, multi_label_themes, incremental), sites
+            ))
+    print_summary(summaries)
+    return summaries
@@ -0,0 +1,58 @@
+"""
+A cheap first stage for sentiment: a label and a confidence per review from
+its star rating and a small lexicon over processed_text, with no model.
+
+analyze_sentiment(..., cascade_threshold=t) keeps the first-stage label of
+every review whose confidence is at least t and sends only the rest to the
+sentiment model. Clear 1-star rants and 5-star raves never reach the model;
+reviews whose words disagree with their rating, or that have no rating or
+no lexicon words, do. benchmarks/bench_cascade.py reports, for a range of
+thresholds, how often the cascade agrees with the model's labels and how
+many rows each stage scores.
+"""
+import numpy as np
+import pandas as pd
+
+# Star rating mapped to -1 (negative) .. 1 (positive)
+RATING_POLARITY = {1: -1.0, 2: -0.5, 3: 0.0, 4: 0.5, 5: 1.0}
+
+# Lemmatized lower-case words, as they appear in processed_text (negations
+# such as "not" are stop words and already removed, so none are listed)
+POSITIVE_WORDS = frozenset("""
+    amazing appreciate appreciated awesome best brilliant cheap cheaper convenient definitely delighted easy easier
+    efficient excellent exceptional fantastic fast faster friendly glad good great happy helpful highly impressed
+    impressive love loved lovely nice perfect perfectly pleased pleasure professional prompt promptly quick quickly
+    recommend recommended reliable satisfied seamless simple smooth super superb thank thanks timely wonderful wow
+""".split())
+NEGATIVE_WORDS = frozenset("""
+    angry appalling avoid awful bad broken crap damaged dishonest disappointed disappointing disaster disgrace
+    disgusting dreadful fail failed failure fraud frustrated frustrating garbage horrendous horrible incompetence
+    incompetent joke liar lie lied lying lost mess nightmare pathetic poor refused ridiculous rude scam shocking
+    shambles stolen stupid terrible trash unacceptable unhelpful unprofessional unreliable useless waste worse worst
+""".split())
+
+DEFAULT_CASCADE_THRESHOLD = 0.75
+
+
+def lexicon_polarity(text):
+    """
+    Returns -1 .. 1 from the lexicon words in `text`, damped towards 0 when
+    there are few of them (one positive word alone gives 0.5).
+    """
+    words = str(text).split()
+    positive = sum(word in POSITIVE_WORDS for word in words)
+    negative = sum(word in NEGATIVE_WORDS for word in words)
+    return (positive - negative) / (positive + negative + 1)
+
+
+def first_stage(ratings, texts):
+    """
+    Returns (labels, confidences) for each review: labels are NEGATIVE,
+    NEUTRAL or POSITIVE, as sentiment_analysis.LABEL_MAP gives them, and
+    confidences run from 0 (a guess) to 1 (rating and words fully agree).
+    """
+    rating_polarity = pd.to_numeric(pd.Series(ratings), errors="coerce").map(RATING_POLARITY).fillna(0.0).to_numpy()
+    text_polarity = np.array([lexicon_polarity(text) for text in texts], dtype=float)
+    score = (rating_polarity + text_polarity) / 2
+    labels = np.where(score > 0, "POSITIVE", np.where(score < 0, "NEGATIVE", "NEUTRAL"))
+    return labels.tolist(), np.abs(score)
@@ -0,0 +1,76 @@
+"""
+Review date normalization.
+
+Trustpilot's <time datetime> values are ISO-8601, so dates are parsed in one
+vectorized strict ISO pass; dateparser, which is far slower, only sees the
+values that pass rejects. Everything is normalized to UTC.
+"""
+import threading
+
+import pandas as pd
+
+# Format of the `date` column in the raw scrape CSV (UTC)
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_counts = {"iso": 0, "fallback": 0, "failed": 0}
+_counts_lock = threading.Lock()
+
+
+def _parse_fallback(value):
+    import dateparser  # slow to import, so deferred until a value needs it
+
+    parsed = dateparser.parse(value, settings={"TO_TIMEZONE": "UTC", "RETURN_AS_TIMEZONE_AWARE": True})
+    return pd.Timestamp(parsed) if parsed else pd.NaT
+
+
+def normalize_dates(values, record=True):
+    """
+    Parses date strings into a Series of UTC timestamps (NaT where neither
+    the ISO parse nor dateparser understands the value). With `record`, the
+    outcome is added to date_counts(); stages re-parsing dates the scraper
+    already normalized pass False.
+    """
+    values = pd.Series(list(values), dtype=object)
+    parsed = pd.to_datetime(values, format="ISO8601", utc=True, errors="coerce")
+
+    rejected = parsed.isna() & values.notna()
+    if rejected.any():
+        # Each distinct value goes through dateparser once
+        fallback = {value: _parse_fallback(str(value)) for value in values[rejected].unique()}
+        parsed[rejected] = pd.to_datetime(values[rejected].map(fallback), utc=True)
+
+    if not record:
+        return parsed
+    failed = int((parsed.isna() & values.notna()).sum())
+    with _counts_lock:
+        _counts["iso"] += int(values.notna().sum() - rejected.sum())
+        _counts["fallback"] += int(rejected.sum()) - failed
+        _counts["failed"] += failed
+    return parsed
+
+
+def format_dates(values):
+    """
+    Normalizes date strings to DATE_FORMAT in UTC, keeping values that cannot
+    be parsed as they are.
+    """
+    parsed = normalize_dates(values)
+    formatted = parsed.dt.strftime(DATE_FORMAT)
+    return [text if isinstance(text, str) else value for text, value in zip(formatted, values)]
+
+
+def date_counts():
+    """
+    Returns how many dates were parsed as ISO-8601, needed the dateparser
+    fallback, or could not be parsed, since the process started.
+    """
+    with _counts_lock:
+        return dict(_counts)
+
+
+def report_date_counts(since=None):
+    counts = date_counts()
+    if since:
+        counts = {name: count - since.get(name, 0) for name, count in counts.items()}
+    print(f"Dates: {counts['iso']} ISO-8601, {counts['fallback']} via dateparser fallback, {counts['failed']} unparsed")
+    return counts
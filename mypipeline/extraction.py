@@ -0,0 +1,171 @@
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.html
+except ImportError:  # lxml is optional; BeautifulSoup's html.parser is the fallback
+    lxml = None
+
+from .dates import format_dates
+
+# Every Trustpilot CSS hook the scraper depends on, as (tag, class attribute).
+# When Trustpilot renames a class, this is the only place to update.
+SELECTORS = {
+    "card": ("article", None),
+    "review": ("section", "styles_reviewContentwrapper__W9Vqf"),
+    "rating": ("div", "star-rating_starRating__sdbkn"),
+    "title": ("h2", "typography_heading-s__RxVny"),
+    "text": ("p", "typography_body-l__v5JLj"),
+    "date": ("time", None),
+    "country": ("div", "typography_body-m__k2UI7 typography_appearance-subtle__PYOVM styles_detailsIcon__ch_FY"),
+}
+
+LAST_PAGE_BUTTON = {"name": "pagination-button-last"}
+
+
+def _build_review(rating_alt, title, text, date, country):
+    rating = int(rating_alt.split()[1]) if rating_alt else None
+    title = title.strip() if title is not None else None
+    text = text.strip() if text is not None else None
+    country = country.strip() if country is not None else None
+
+    if not (rating and title and text and date and country):
+        return None
+
+    # Remove "Updated " from the text; dates are parsed per page in parse_reviews
+    if "Updated " in date:
+        date = date.replace("Updated ", "")
+
+    return {
+        "rating": rating,
+        "title": title,
+        "text": text,
+        "date": date,
+        "country": country
+    }
+
+
+def _class_xpath(axis, name):
+    tag, classes = SELECTORS[name]
+    if not classes:
+        return f"{axis}{tag}"
+    conditions = " and ".join(
+        f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')" for cls in classes.split()
+    )
+    return f"{axis}{tag}[{conditions}]"
+
+
+if lxml is not None:
+    _XPATHS = {
+        "review": _class_xpath("//", "review"),
+        "card": _class_xpath("ancestor::", "card") + "[1]",
+        "rating": _class_xpath(".//", "rating") + "//img/@alt",
+        "title": _class_xpath(".//", "title"),
+        "text": _class_xpath(".//", "text"),
+        "date": _class_xpath(".//", "date") + "/@datetime",
+        "country_in_card": _class_xpath(".//", "country") + "//span",
+        "country_before": _class_xpath("preceding::", "country") + "[1]//span",
+    }
+
+
+def _first(values):
+    return values[0] if values else None
+
+
+def _parse_reviews_lxml(html):
+    if not html.strip():
+        return []
+    # The whole page is parsed: lxml builds the tree in C, and narrowing it
+    # to the cards with a tag-filtered HTMLPullParser measured slower
+    root = lxml.html.fromstring(html)
+    reviews = []
+    for review in root.xpath(_XPATHS["review"]):
+        try:
+            # The country sits in the card's consumer details, next to the review content
+            card = _first(review.xpath(_XPATHS["card"]))
+            country_tag = _first(card.xpath(_XPATHS["country_in_card"])) if card is not None else None
+            if country_tag is None:
+                country_tag = _first(review.xpath(_XPATHS["country_before"]))
+
+            title_tag = _first(review.xpath(_XPATHS["title"]))
+            text_tag = _first(review.xpath(_XPATHS["text"]))
+            parsed = _build_review(
+                _first(review.xpath(_XPATHS["rating"])),
+                title_tag.text_content() if title_tag is not None else None,
+                text_tag.text_content() if text_tag is not None else None,
+                _first(review.xpath(_XPATHS["date"])),
+                country_tag.text_content() if country_tag is not None else None,
+            )
+        except Exception as e:
+            # print(f"Error extracting review: {e}")
+            continue
+        if parsed:
+            reviews.append(parsed)
+    return reviews
+
+
+def _find(tag, name):
+    element, classes = SELECTORS[name]
+    return tag.find(element, class_=classes) if classes else tag.find(element)
+
+
+def _parse_reviews_bs4(html):
+    # Only build the tree for review cards; fall back to the whole page if
+    # the markup no longer wraps reviews in cards
+    soup = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer(SELECTORS["card"][0]))
+    review_tag, review_class = SELECTORS["review"]
+    if not soup.find(review_tag, class_=review_class):
+        soup = BeautifulSoup(html, "html.parser")
+
+    reviews = []
+    for review in soup.find_all(review_tag, class_=review_class):
+        try:
+            rating_tag = _find(review, "rating")
+            title_tag = _find(review, "title")
+            text_tag = _find(review, "text")
+            date_tag = _find(review, "date")
+
+            card = review.find_parent(SELECTORS["card"][0])
+            country_tag = _find(card, "country") if card is not None else None
+            if country_tag is None:
+                country_tag = review.find_previous(SELECTORS["country"][0], class_=SELECTORS["country"][1])
+            country_span = country_tag.find("span") if country_tag else None
+
+            parsed = _build_review(
+                rating_tag.img["alt"] if rating_tag and rating_tag.img else None,
+                title_tag.text if title_tag else None,
+                text_tag.text if text_tag else None,
+                date_tag.get("datetime") if date_tag else None,
+                country_span.text if country_span else None,
+            )
+        except Exception as e:
+            # print(f"Error extracting review: {e}")
+            continue
+        if parsed:
+            reviews.append(parsed)
+    return reviews
+
+
+def parse_reviews(html):
+    """
+    Extracts the reviews on one Trustpilot page, using lxml when it is
+    installed and BeautifulSoup's html.parser otherwise.
+    """
+    reviews = _parse_reviews_lxml(html) if lxml is not None else _parse_reviews_bs4(html)
+    for review, date in zip(reviews, format_dates([review["date"] for review in reviews])):
+        review["date"] = date
+    return reviews
+
+
+def parse_last_page_number(html):
+    soup = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("a", LAST_PAGE_BUTTON))
+    pagination_button = soup.find("a", LAST_PAGE_BUTTON)
+    return int(pagination_button["aria-label"].split()[-1]) if pagination_button else 1
+
+
+def missing_selectors(html):
+    """
+    Returns the SELECTORS entries that match nothing on the page, to explain
+    why a page produced no reviews.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    return [name for name in SELECTORS if _find(soup, name) is None]
@@ -0,0 +1,140 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .instrumentation import emit
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HostRateLimiter:
+    """
+    Spaces out requests to the same host so there are at most
+    `requests_per_second` of them, whatever the number of worker threads.
+    """
+
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class PageFetcher:
+    """
+    Fetches pages concurrently over one pooled requests.Session, with per-host
+    rate limiting, timeouts and exponential-backoff retries.
+
+    With an `archive` (a page_archive.PageArchive), every page fetched is
+    archived, and pages already in it are refetched conditionally: a 304
+    is answered from the archive.
+    """
+
+    def __init__(self, headers=None, max_workers=8, requests_per_second=5.0,
+                 max_retries=3, backoff_factor=0.5, timeout=(5, 30), archive=None):
+        self.max_workers = max_workers
+        self.archive = archive
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.rate_limiter = HostRateLimiter(requests_per_second)
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def _backoff(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff_factor * (2 ** attempt)
+
+    def get(self, url, headers=None):
+        """
+        Returns the response for `url`, retrying connection errors, timeouts and
+        retryable status codes. Raises once retries are exhausted.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.wait(url)
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                print(f"Retrying {url} in {delay:.1f}s ({e.__class__.__name__})")
+                emit("retry", url=url, attempt=attempt + 1, delay=delay, reason=e.__class__.__name__)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    response.raise_for_status()
+                    return response
+                delay = self._backoff(attempt, response)
+                print(f"Retrying {url} in {delay:.1f}s (HTTP {response.status_code})")
+                emit("retry", url=url, attempt=attempt + 1, delay=delay, reason=f"HTTP {response.status_code}")
+            time.sleep(delay)
+
+    def fetch(self, url):
+        if self.archive is None:
+            return self.get(url).text
+        response = self.get(url, headers=self.archive.conditional_headers(url))
+        if response.status_code == 304:
+            html = self.archive.mark_not_modified(url)
+            if html is not None:
+                return html
+            # Pruned from the archive since the headers were read
+            response = self.get(url)
+        self.archive.store(url, response.text, etag=response.headers.get("ETag"),
+                           last_modified=response.headers.get("Last-Modified"))
+        return response.text
+
+    def fetch_all(self, urls):
+        """
+        Fetches `urls` concurrently and returns their bodies in the same order.
+        Pages that still fail after all retries come back as None.
+        """
+        urls = list(urls)
+        done = itertools.count(1)
+
+        def fetch_or_none(url):
+            try:
+                return self.fetch(url)
+            except requests.RequestException as e:
+                print(f"Failed to fetch {url}: {e}")
+                emit("fetch_failed", url=url, error=repr(e))
+                return None
+            finally:
+                emit("progress", stage="fetch", done=next(done), total=len(urls))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(fetch_or_none, urls))
@@ -0,0 +1,90 @@
+import os
+import time
+
+from .instrumentation import emit
+
+DEFAULT_BATCH_SIZE = 32
+MAX_LENGTH = 512
+
+# Thread pools of the native libraries under torch, sized when they load
+_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def pin_threads(threads):
+    """
+    Limits torch (and the OpenMP/MKL pools under it) to `threads` intra-op
+    threads and one inter-op thread in this process. Takes full effect only
+    before torch is first used, e.g. at the start of a worker process.
+    """
+    for name in _THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set once, before any inter-op work has started
+        pass
+
+
+class BatchedSentimentEngine:
+    """
+    Runs a sequence-classification model over many texts in padded batches.
+
+    Inputs are tokenized once (truncated by the tokenizer to `max_length`
+    tokens), sorted by token length so each batch pads to a similar length,
+    and the predicted labels are returned in the original input order.
+    """
+
+    def __init__(self, tokenizer, model, batch_size=DEFAULT_BATCH_SIZE, max_length=MAX_LENGTH):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.tokenizer = tokenizer
+        self.model = model
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.last_rows_per_sec = None
+
+    def _forward(self, encodings):
+        import torch
+
+        batch = self.tokenizer.pad(encodings, return_tensors="pt")
+        batch = {name: tensor.to(self.model.device) for name, tensor in batch.items()}
+        with torch.inference_mode():
+            logits = self.model(**batch).logits
+        id2label = self.model.config.id2label
+        return [id2label[int(i)] for i in logits.argmax(dim=-1)]
+
+    def predict(self, texts):
+        texts = [str(text) for text in texts]
+        start = time.perf_counter()
+
+        encoded = self.tokenizer(texts, truncation=True, max_length=self.max_length)
+        order = sorted(range(len(texts)), key=lambda i: len(encoded["input_ids"][i]))
+
+        labels = [None] * len(texts)
+        for offset in range(0, len(order), self.batch_size):
+            indices = order[offset:offset + self.batch_size]
+            encodings = [{key: encoded[key][i] for key in encoded.keys()} for i in indices]
+            try:
+                batch_labels = self._forward(encodings)
+            except Exception:
+                # Retry row by row so one bad input does not fail the whole batch
+                batch_labels = []
+                for encoding in encodings:
+                    try:
+                        batch_labels.extend(self._forward([encoding]))
+                    except Exception:
+                        batch_labels.append(None)
+            for i, label in zip(indices, batch_labels):
+                labels[i] = label
+
+        elapsed = time.perf_counter() - start
+        self.last_rows_per_sec = len(texts) / elapsed if elapsed > 0 else float("inf")
+        print(
+            f"Scored {len(texts)} rows in {elapsed:.2f}s "
+            f"({self.last_rows_per_sec:.1f} rows/sec, batch_size={self.batch_size})"
+        )
+        emit("rows", stage="sentiment", rows=len(texts), seconds=elapsed, rows_per_sec=self.last_rows_per_sec)
+        return labels
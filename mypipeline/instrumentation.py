@@ -0,0 +1,177 @@
+"""
+Structured pipeline events.
+
+Code reports progress with emit(kind, **fields); every registered sink (any
+callable taking an Event) receives it. With no sinks registered, emit does
+nothing. Kinds emitted by the pipeline:
+
+- run_start / run_end: a stage graph run (run, stages / seconds, status)
+- stage_start / stage_end / stage_failed: one stage (stage, seconds, rows,
+  rows_per_sec, peak_rss_mb, error)
+- progress: work done within a stage (stage, done, total)
+- rows: a batch of rows processed (stage, rows, seconds, rows_per_sec; workers and
+  threads when scored by an InferencePool)
+- cache: sentiment cache lookups (hits, misses, hit_rate)
+- cascade: rows labelled by the sentiment cascade's first stage and by the model
+  (threshold, first_stage, model, first_stage_share)
+- archive: pages archived by a scrape (stored, unchanged, not_modified)
+- retry / fetch_failed: HTTP retries and pages given up on (url, attempt, delay, reason / error)
+- site_end: one site of a batch run (site, status, seconds, rows)
+"""
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+class Event:
+    def __init__(self, kind, fields):
+        self.kind = kind
+        self.time = time.time()
+        self.fields = fields
+
+    def to_dict(self):
+        return {"kind": self.kind, "time": self.time, **self.fields}
+
+    def __repr__(self):
+        return f"Event({self.kind!r}, {self.fields!r})"
+
+
+_sinks = []
+_sinks_lock = threading.Lock()
+
+
+def add_sink(sink):
+    with _sinks_lock:
+        _sinks.append(sink)
+    return sink
+
+
+def remove_sink(sink):
+    with _sinks_lock:
+        if sink in _sinks:
+            _sinks.remove(sink)
+
+
+@contextlib.contextmanager
+def using_sinks(*sinks):
+    """
+    Registers `sinks` for the duration of the block.
+    """
+    for sink in sinks:
+        add_sink(sink)
+    try:
+        yield sinks
+    finally:
+        for sink in sinks:
+            remove_sink(sink)
+
+
+def emit(kind, **fields):
+    with _sinks_lock:
+        sinks = list(_sinks)
+    if not sinks:
+        return None
+    event = Event(kind, fields)
+    for sink in sinks:
+        try:
+            sink(event)
+        except Exception as e:
+            # A broken sink must never fail the pipeline
+            print(f"Event sink {sink!r} failed: {e!r}")
+    return event
+
+
+def peak_rss_mb():
+    """
+    Peak resident memory of this process in MB, or None where unavailable.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def format_event(event):
+    """
+    Renders an event as one human-readable line.
+    """
+    f = event.fields
+    run = f" {f['run']}" if f.get("run") else ""
+    if event.kind == "run_start":
+        return f"Run{run} started: {', '.join(f.get('stages', []))}"
+    if event.kind == "run_end":
+        return f"Run{run} {f['status']} in {f['seconds']:.1f}s"
+    if event.kind == "stage_start":
+        return f"{f['stage']}: started"
+    if event.kind == "stage_end":
+        line = f"{f['stage']}: finished in {f['seconds']:.2f}s"
+        if f.get("rows") is not None:
+            line += f", {f['rows']} rows"
+        if f.get("rows_per_sec") is not None:
+            line += f" ({f['rows_per_sec']:.0f} rows/sec)"
+        if f.get("peak_rss_mb"):
+            line += f", peak RSS {f['peak_rss_mb']:.0f} MB"
+        return line
+    if event.kind == "stage_failed":
+        return f"{f['stage']}: failed after {f['seconds']:.2f}s: {f['error']}"
+    if event.kind == "progress":
+        total = f" / {f['total']}" if f.get("total") else ""
+        return f"{f['stage']}: {f['done']}{total}"
+    if event.kind == "rows":
+        return f"{f['stage']}: {f['rows']} rows in {f['seconds']:.2f}s ({f['rows_per_sec']:.1f} rows/sec)"
+    if event.kind == "cache":
+        return f"Sentiment cache: {f['hits']} hits, {f['misses']} misses ({f['hit_rate']:.1f}% hit rate)"
+    if event.kind == "retry":
+        return f"Retrying {f['url']} in {f['delay']:.1f}s ({f['reason']})"
+    details = ", ".join(f"{name}={value}" for name, value in f.items())
+    return f"{event.kind}: {details}"
+
+
+class ConsoleSink:
+    """
+    Prints events to stdout. `kinds` limits it to some event kinds.
+    """
+
+    def __init__(self, kinds=None):
+        self.kinds = set(kinds) if kinds else None
+
+    def __call__(self, event):
+        if self.kinds is None or event.kind in self.kinds:
+            print(f"[{time.strftime('%H:%M:%S', time.localtime(event.time))}] {format_event(event)}")
+
+
+class JsonLinesSink:
+    """
+    Appends every event to a JSON-lines file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __call__(self, event):
+        line = json.dumps(event.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,242 @@
+"""
+Background pipeline jobs for the dashboard.
+
+JobRunner.submit records a job in an on-disk table (data/jobs.sqlite) and
+returns its id at once; a thread pool then runs the pipeline. A request
+for a site that already has a queued or running job with the same options,
+in this process or another, gets that job's id rather than a second run.
+Runs for the same site with different options take turns on the site's
+file lock (pipeline.site_lock). Job progress comes from the stage and
+progress events of the job's run and is written to the table, with the
+last LOG_LINES events as log lines, where any session or process can poll
+it with get(job_id).
+"""
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .instrumentation import add_sink, format_event, remove_sink
+
+DEFAULT_JOBS_PATH = os.path.join("data", "jobs.sqlite")
+
+# Statuses of jobs that have not finished yet
+ACTIVE_STATUSES = ("queued", "running")
+
+# Recent events kept on each job row for display
+LOG_LINES = 50
+
+_COLUMNS = ("id", "site", "options", "status", "pid", "created", "started", "finished",
+            "progress", "message", "result", "error", "log")
+
+
+def _process_alive(pid):
+    if os.name == "nt":
+        # os.kill would terminate the process rather than probe it
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _job(row):
+    job = dict(zip(_COLUMNS, row))
+    job["options"] = json.loads(job["options"])
+    job["log"] = json.loads(job["log"]) if job["log"] else []
+    return job
+
+
+class JobRunner:
+    """
+    Runs run_full_pipeline calls on `max_workers` background threads and
+    tracks them in the job table at `path`.
+    """
+
+    def __init__(self, max_workers=2, path=DEFAULT_JOBS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # site -> state (job id, stages, finished stages, progress within a stage, log) of this runner's running jobs
+        self._active = {}
+        # Jobs for the same site run one at a time, so each site's events belong to one job
+        self._site_locks = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Autocommit, with explicit transactions where reads and writes must not interleave
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, site TEXT NOT NULL, options TEXT NOT NULL, "
+            "status TEXT NOT NULL, pid INTEGER, created REAL NOT NULL, started REAL, finished REAL, "
+            "progress REAL NOT NULL DEFAULT 0, message TEXT, result TEXT, error TEXT)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS jobs_site_status ON jobs (site, status)")
+        # Tables created before the log column existed
+        if "log" not in {row[1] for row in self.connection.execute("PRAGMA table_info(jobs)")}:
+            self.connection.execute("ALTER TABLE jobs ADD COLUMN log TEXT")
+        add_sink(self._on_event)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self, wait=True):
+        remove_sink(self._on_event)
+        self._executor.shutdown(wait=wait)
+        with self._lock:
+            self.connection.close()
+
+    def _update(self, job_id, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self.connection.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", [*fields.values(), job_id])
+
+    def _mark_interrupted(self):
+        # Active jobs whose process died (e.g. a restarted dashboard) will never finish
+        placeholders = ",".join("?" * len(ACTIVE_STATUSES))
+        rows = self.connection.execute(
+            f"SELECT id, pid FROM jobs WHERE status IN ({placeholders})", ACTIVE_STATUSES
+        ).fetchall()
+        for job_id, pid in rows:
+            if pid != os.getpid() and not _process_alive(pid):
+                self.connection.execute(
+                    "UPDATE jobs SET status = 'interrupted', finished = ?, message = ? WHERE id = ?",
+                    (time.time(), "Interrupted: the process running it exited", job_id),
+                )
+
+    def submit(self, site_to_review, **options):
+        """
+        Queues run_full_pipeline(site_to_review, **options) and returns the job
+        id, or the id of the queued or running job that already does the same.
+        """
+        options_json = json.dumps(options, sort_keys=True)
+        placeholders = ",".join("?" * len(ACTIVE_STATUSES))
+        with self._lock:
+            # IMMEDIATE so another process cannot insert the same job between the check and the insert
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._mark_interrupted()
+                row = self.connection.execute(
+                    f"SELECT id FROM jobs WHERE site = ? AND options = ? AND status IN ({placeholders}) "
+                    "ORDER BY created LIMIT 1",
+                    (site_to_review, options_json, *ACTIVE_STATUSES),
+                ).fetchone()
+                if row:
+                    self.connection.execute("COMMIT")
+                    print(f"Joining job {row[0]} already running for {site_to_review}")
+                    return row[0]
+                job_id = uuid.uuid4().hex[:12]
+                self.connection.execute(
+                    "INSERT INTO jobs (id, site, options, status, pid, created, message) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, site_to_review, options_json, "queued", os.getpid(), time.time(), "Queued"),
+                )
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+        self._executor.submit(self._run, job_id, site_to_review, options)
+        print(f"Queued job {job_id} for {site_to_review}")
+        return job_id
+
+    def _run(self, job_id, site_to_review, options):
+        from .pipeline import run_full_pipeline
+
+        with self._lock:
+            site_lock = self._site_locks.setdefault(site_to_review, threading.Lock())
+        if not site_lock.acquire(blocking=False):
+            self._update(job_id, message=f"Waiting for another job for {site_to_review}...")
+            site_lock.acquire()
+        try:
+            with self._lock:
+                self._active[site_to_review] = {
+                    "job_id": job_id, "stages": [], "finished": set(), "partial": 0.0, "log": deque(maxlen=LOG_LINES),
+                }
+            self._update(job_id, status="running", started=time.time(), message="Starting...")
+            try:
+                result = run_full_pipeline(site_to_review, **options)
+            except Exception as e:
+                print(f"Job {job_id} for {site_to_review} failed: {e!r}")
+                self._update(job_id, status="failed", finished=time.time(), message=f"Failed: {e}", error=repr(e))
+            else:
+                self._update(job_id, status="succeeded", finished=time.time(), progress=1.0, message="Finished",
+                             result=result)
+        finally:
+            with self._lock:
+                self._active.pop(site_to_review, None)
+            site_lock.release()
+
+    def _on_event(self, event):
+        fields = event.fields
+        with self._lock:
+            if "run" in fields:
+                active = self._active.get(fields["run"])
+            else:
+                # Events such as fetch progress, retries and inference rows do not name their run;
+                # they can only be told apart while a single job is running
+                active = next(iter(self._active.values())) if len(self._active) == 1 else None
+            if active is None:
+                return
+            if event.kind == "run_start":
+                active["stages"][:] = fields.get("stages", [])
+            elif event.kind in ("stage_end", "stage_failed"):
+                active["finished"].add(fields["stage"])
+                active["partial"] = 0.0
+            elif event.kind == "progress" and fields.get("total"):
+                active["partial"] = fields["done"] / fields["total"]
+            if event.kind != "progress":
+                # Frequent, so shown as the message rather than logged
+                timestamp = datetime.datetime.fromtimestamp(event.time).strftime("%Y-%m-%d %H:%M:%S")
+                active["log"].append(f"[{timestamp}] {format_event(event)}")
+            stages, finished = active["stages"], active["finished"]
+            progress = min((len(finished) + min(active["partial"], 0.99)) / len(stages), 0.99) if stages else 0.0
+            job_id, log = active["job_id"], json.dumps(list(active["log"]))
+        update = {"progress": progress, "log": log}
+        if event.kind == "stage_start":
+            update["message"] = f"Running {fields['stage']}..."
+        elif event.kind in ("progress", "stage_end", "stage_failed", "run_start", "run_end"):
+            update["message"] = format_event(event)
+        self._update(job_id, **update)
+
+    def get(self, job_id):
+        """
+        Returns the job as a dict (status, progress, message, result, error,
+        ...), or None if there is no such job.
+        """
+        with self._lock:
+            row = self.connection.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job(row) if row else None
+
+    def recent(self, limit=20):
+        """
+        Returns the most recently created jobs, newest first.
+        """
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs ORDER BY created DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [_job(row) for row in rows]
+
+    def wait(self, job_id, timeout=None, interval=0.5):
+        """
+        Polls until the job finishes and returns it, or returns it unfinished
+        after `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] not in ACTIVE_STATUSES:
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(interval)
@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+
+from .backends import default_backend, load_onnx, quantize_int8
+
+DEFAULT_MODEL_NAME = "cardiffnlp/twitter-roberta-base-sentiment"
+
+# Optional cap on the memory held by warm models, e.g. MODEL_MEMORY_BUDGET_MB=2048
+MEMORY_BUDGET_ENV = "MODEL_MEMORY_BUDGET_MB"
+
+_DTYPES = ("float32", "float16", "bfloat16")
+
+
+class ModelHandle:
+    def __init__(self, key, tokenizer, model, load_seconds):
+        self.key = key
+        self.tokenizer = tokenizer
+        self.model = model
+        self.load_seconds = load_seconds
+        self.last_used = time.monotonic()
+        self.size_bytes = getattr(model, "size_bytes", None) or sum(
+            p.numel() * p.element_size() for p in model.parameters()
+        )
+
+    @property
+    def model_name(self):
+        return self.key[0]
+
+    @property
+    def dtype(self):
+        return self.key[2]
+
+    @property
+    def backend(self):
+        return self.key[3]
+
+    @property
+    def revision(self):
+        return _revision_label(getattr(self.model.config, "_commit_hash", None), self.backend, self.dtype)
+
+
+def _revision_label(commit_hash, backend, dtype="float32"):
+    # Hub commit the weights were loaded from, when transformers records it.
+    # Other backends and half-precision dtypes can label a few borderline
+    # texts differently, so their labels are cached separately.
+    revision = commit_hash or "unknown"
+    if backend != "torch":
+        revision += f"+{backend}"
+    if dtype != "float32":
+        revision += f"+{dtype}"
+    return revision
+
+
+_handles = {}
+# model name -> Hub commit of its config, for model_revision
+_commit_hashes = {}
+_load_locks = {}
+_registry_lock = threading.Lock()
+
+
+def _memory_budget_bytes():
+    budget_mb = os.environ.get(MEMORY_BUDGET_ENV)
+    return int(float(budget_mb) * 1024 * 1024) if budget_mb else None
+
+
+def _load(key):
+    # torch and transformers are only imported once a model is actually needed
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    model_name, device, dtype, backend = key
+    if dtype not in _DTYPES:
+        raise ValueError(f"Unsupported dtype '{dtype}'. Expected one of {sorted(_DTYPES)}")
+    if backend != "torch" and (device != "cpu" or dtype != "float32"):
+        raise ValueError(f"The {backend} backend runs float32 models on cpu only")
+
+    start = time.perf_counter()
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if backend == "onnx":
+        model = load_onnx(model_name, tokenizer)
+    else:
+        model = AutoModelForSequenceClassification.from_pretrained(model_name, torch_dtype=getattr(torch, dtype))
+        model.to(device)
+        model.eval()
+        if backend == "torch-int8":
+            model = quantize_int8(model)
+    return ModelHandle(key, tokenizer, model, time.perf_counter() - start)
+
+
+def get_model(model_name=DEFAULT_MODEL_NAME, device="cpu", dtype="float32", backend=None):
+    """
+    Returns a warm ModelHandle for (model_name, device, dtype, backend),
+    loading it on first use. See mypipeline.backends for the backends.
+    """
+    backend = backend or default_backend()
+    key = (model_name, device, dtype, backend)
+    start = time.perf_counter()
+
+    with _registry_lock:
+        handle = _handles.get(key)
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+
+    if handle is None:
+        # Only one thread loads a given model; the others wait and reuse it
+        with load_lock:
+            with _registry_lock:
+                handle = _handles.get(key)
+            if handle is None:
+                handle = _load(key)
+                with _registry_lock:
+                    _handles[key] = handle
+                print(f"Loaded model {model_name} on {device} ({dtype}, {backend}) in {handle.load_seconds:.2f}s (cold)")
+                handle.last_used = time.monotonic()
+                enforce_memory_budget(keep=key)
+                return handle
+
+    handle.last_used = time.monotonic()
+    print(f"Reusing warm model {model_name} on {device} ({dtype}, {backend}), {(time.perf_counter() - start) * 1000:.1f}ms")
+    return handle
+
+
+def model_revision(model_name=DEFAULT_MODEL_NAME, backend=None, dtype="float32"):
+    """
+    Returns the revision a loaded ModelHandle for the model would report,
+    without loading its weights: from a warm handle if there is one, else
+    from the model's config.json (read from the local Hub cache when it is
+    there).
+    """
+    backend = backend or default_backend()
+    for handle in loaded_models():
+        if handle.model_name == model_name and handle.backend == backend and handle.dtype == dtype:
+            return handle.revision
+
+    with _registry_lock:
+        known = model_name in _commit_hashes
+        commit_hash = _commit_hashes.get(model_name)
+    if not known:
+        from transformers import AutoConfig
+
+        commit_hash = getattr(AutoConfig.from_pretrained(model_name), "_commit_hash", None)
+        with _registry_lock:
+            _commit_hashes[model_name] = commit_hash
+    return _revision_label(commit_hash, backend, dtype)
+
+
+def prewarm(model_names=(DEFAULT_MODEL_NAME,), device="cpu", dtype="float32", backend=None):
+    for model_name in model_names:
+        get_model(model_name, device=device, dtype=dtype, backend=backend)
+
+
+def loaded_models():
+    with _registry_lock:
+        return list(_handles.values())
+
+
+def evict(key):
+    with _registry_lock:
+        handle = _handles.pop(key, None)
+    if handle is not None:
+        print(f"Evicted model {handle.model_name} ({handle.size_bytes / 1024 / 1024:.0f} MB)")
+    return handle is not None
+
+
+def evict_idle(max_idle_seconds):
+    """
+    Drops every warm model that has not been used for `max_idle_seconds`.
+    """
+    now = time.monotonic()
+    idle = [h.key for h in loaded_models() if now - h.last_used > max_idle_seconds]
+    for key in idle:
+        evict(key)
+    return len(idle)
+
+
+def enforce_memory_budget(budget_bytes=None, keep=None):
+    """
+    Evicts least recently used models until the warm set fits the memory budget.
+    """
+    budget_bytes = budget_bytes if budget_bytes is not None else _memory_budget_bytes()
+    if budget_bytes is None:
+        return 0
+
+    evicted = 0
+    handles = sorted(loaded_models(), key=lambda h: h.last_used)
+    total = sum(h.size_bytes for h in handles)
+    for handle in handles:
+        if total <= budget_bytes:
+            break
+        if handle.key == keep:
+            continue
+        if evict(handle.key):
+            total -= handle.size_bytes
+            evicted += 1
+    return evicted
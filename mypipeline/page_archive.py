@@ -0,0 +1,153 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from .instrumentation import emit
+
+DEFAULT_ARCHIVE_PATH = os.path.join("data", "page_archive.sqlite")
+
+# Versions of each URL kept; older ones are dropped when a new one is stored
+DEFAULT_MAX_VERSIONS = 3
+
+
+def compress(html):
+    return zlib.compress(html.encode("utf-8"), 6)
+
+
+def decompress(body):
+    return zlib.decompress(body).decode("utf-8")
+
+
+class PageArchive:
+    """
+    Fetched HTML, zlib-compressed and keyed by URL and fetch time, with the
+    ETag and Last-Modified headers it came with so the next fetch of the
+    URL can be conditional. A refetch that returns the same HTML (or a 304)
+    only marks the stored version as validated again.
+
+    Safe to share between the threads of a PageFetcher.
+    """
+
+    def __init__(self, path=DEFAULT_ARCHIVE_PATH, max_versions=DEFAULT_MAX_VERSIONS):
+        self.path = path
+        self.max_versions = max_versions
+        self.stored = 0
+        self.unchanged = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS pages (url TEXT NOT NULL, fetched REAL NOT NULL, validated REAL NOT NULL, "
+            "etag TEXT, last_modified TEXT, sha256 TEXT NOT NULL, body BLOB NOT NULL, PRIMARY KEY (url, fetched))"
+        )
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+    def _latest(self, url, columns):
+        return self.connection.execute(
+            f"SELECT {columns} FROM pages WHERE url = ? ORDER BY fetched DESC LIMIT 1", (url,)
+        ).fetchone()
+
+    def conditional_headers(self, url):
+        """
+        Returns If-None-Match / If-Modified-Since headers for refetching `url`,
+        or {} if it has never been archived.
+        """
+        with self._lock:
+            row = self._latest(url, "etag, last_modified")
+        headers = {}
+        if row and row[0]:
+            headers["If-None-Match"] = row[0]
+        if row and row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def latest(self, url):
+        """
+        Returns the most recently fetched HTML for `url`, or None.
+        """
+        with self._lock:
+            row = self._latest(url, "body")
+        return decompress(row[0]) if row else None
+
+    def mark_not_modified(self, url):
+        """
+        Records a 304 for `url` and returns its archived HTML (None if the
+        archive no longer has it).
+        """
+        with self._lock:
+            row = self._latest(url, "fetched, body")
+            if row is None:
+                return None
+            self.connection.execute("UPDATE pages SET validated = ? WHERE url = ? AND fetched = ?",
+                                    (time.time(), url, row[0]))
+            self.connection.commit()
+            self.not_modified += 1
+        return decompress(row[1])
+
+    def store(self, url, html, etag=None, last_modified=None):
+        digest = hashlib.sha256(html.encode("utf-8")).hexdigest()
+        now = time.time()
+        with self._lock:
+            row = self._latest(url, "fetched, sha256")
+            if row and row[1] == digest:
+                self.connection.execute(
+                    "UPDATE pages SET validated = ?, etag = ?, last_modified = ? WHERE url = ? AND fetched = ?",
+                    (now, etag, last_modified, url, row[0]),
+                )
+                self.unchanged += 1
+            else:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO pages (url, fetched, validated, etag, last_modified, sha256, body) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (url, now, now, etag, last_modified, digest, compress(html)),
+                )
+                self.connection.execute(
+                    "DELETE FROM pages WHERE url = ? AND fetched NOT IN "
+                    "(SELECT fetched FROM pages WHERE url = ? ORDER BY fetched DESC LIMIT ?)",
+                    (url, url, self.max_versions),
+                )
+                self.stored += 1
+            self.connection.commit()
+
+    def count(self, url_prefix):
+        """
+        Returns how many distinct URLs starting with `url_prefix` are archived.
+        """
+        with self._lock:
+            (count,) = self.connection.execute(
+                "SELECT COUNT(DISTINCT url) FROM pages WHERE substr(url, 1, ?) = ?", (len(url_prefix), url_prefix)
+            ).fetchone()
+        return count
+
+    def latest_pages(self, url_prefix):
+        """
+        Returns [(url, compressed html)] for the latest version of every
+        archived URL starting with `url_prefix`.
+        """
+        with self._lock:
+            return self.connection.execute(
+                "SELECT url, body FROM pages AS p WHERE substr(url, 1, ?) = ? "
+                "AND fetched = (SELECT MAX(fetched) FROM pages WHERE url = p.url)",
+                (len(url_prefix), url_prefix),
+            ).fetchall()
+
+    def report(self):
+        print(f"Page archive: {self.stored} pages stored, {self.unchanged} unchanged, "
+              f"{self.not_modified} not modified (304)")
+        emit("archive", stored=self.stored, unchanged=self.unchanged, not_modified=self.not_modified)
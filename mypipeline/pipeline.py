@@ -1,21 +1,200 @@
 # mypipeline/pipeline.py
-from .scrapper import scrape_trustpilot_reviews
-from .preprocessing import preprocess_reviews
-from .sentiment_analysis import analyze_sentiment
-from .theme_detection import detect_themes
-
-def run_full_pipeline(site_to_review):
-    print("Starting scraping...")
-    raw_csv = scrape_trustpilot_reviews(site_to_review)
-    
-    print("\nStarting preprocessing...")
-    processed_csv = preprocess_reviews(raw_csv)
-    
-    print("\nAnalyzing sentiment...")
-    sentiment_csv = analyze_sentiment(processed_csv)
-    
-    print("\nDetecting themes...")
-    final_csv = detect_themes(sentiment_csv)
-    
+import contextlib
+import os
+
+
+def manifest_path(site_to_review):
+    return os.path.join("data", site_to_review.replace('.', '_') + "_manifest.json")
+
+
+def metrics_path(site_to_review):
+    # One JSON line of stage timings, row counts and peak memory per run
+    return os.path.join("data", site_to_review.replace('.', '_') + "_metrics.jsonl")
+
+
+def lock_path(site_to_review):
+    return os.path.join("data", site_to_review.replace('.', '_') + ".lock")
+
+
+@contextlib.contextmanager
+def site_lock(site_to_review):
+    """
+    Holds the site's lock file while its pipeline runs, so two runs for the
+    same site (from other threads, dashboard sessions or processes) take
+    turns instead of racing on its files in data/.
+    """
+    from filelock import FileLock, Timeout
+
+    os.makedirs(os.path.dirname(lock_path(site_to_review)), exist_ok=True)
+    lock = FileLock(lock_path(site_to_review))
+    try:
+        lock.acquire(timeout=0)
+    except Timeout:
+        print(f"Waiting for another run for {site_to_review} to finish...")
+        lock.acquire()
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+def index_results(site_to_review, results_path):
+    # Every site's results go to one queryable store for cross-site filtering
+    from .review_store import ReviewStore
+
+    ReviewStore().load_results(site_to_review, results_path)
+
+
+def build_stages(site_to_review, multi_label_themes=False, incremental=False,
+                 model_name=None, device="cpu", dtype="float32", backend=None, inference_pool=None,
+                 cascade_threshold=None):
+    # Stage modules pull in bs4, nltk and transformers, so they are imported
+    # on first run rather than when the package is imported
+    from . import (
+        aggregates, backends, cascade, extraction, inference, preprocessing, scrapper, sentiment_analysis,
+        theme_detection,
+    )
+    from .stages import Stage
+
+    model_name = model_name or sentiment_analysis.MODEL_NAME
+    backend = backend or backends.default_backend()
+    sentiment_config = {"model": model_name, "device": device, "dtype": dtype, "backend": backend}
+    sentiment_code = [sentiment_analysis, inference, backends]
+    if cascade_threshold is not None:
+        # Only cascade runs depend on it, so plain runs keep their fingerprints
+        sentiment_config["cascade_threshold"] = cascade_threshold
+        sentiment_code.append(cascade)
+
+    return [
+        # The raw scrape is the source of truth and is never forced to refetch; when
+        # extraction changes it is re-extracted offline from the page archive instead
+        Stage(
+            "scrape",
+            lambda inputs, force: scrapper.scrape_trustpilot_reviews(
+                site_to_review, incremental=incremental, reextract=force
+            ),
+            config={"site": site_to_review},
+            code=[extraction],
+            output_columns=("rating", "title", "text", "date", "country"),
+            description="Starting scraping...",
+        ),
+        Stage(
+            "preprocess",
+            lambda inputs, force: preprocessing.preprocess_reviews(
+                inputs["scrape"], incremental=incremental, overwrite=force
+            ),
+            inputs=["scrape"],
+            code=[preprocessing],
+            output_columns=("processed_text", "date_utc"),
+            description="\nStarting preprocessing...",
+        ),
+        Stage(
+            "sentiment",
+            lambda inputs, force: sentiment_analysis.analyze_sentiment(
+                inputs["preprocess"], device=device, dtype=dtype, incremental=incremental, overwrite=force,
+                backend=backend, inference_pool=inference_pool, cascade_threshold=cascade_threshold,
+                model_name=model_name,
+            ),
+            inputs=["preprocess"],
+            config=sentiment_config,
+            code=sentiment_code,
+            output_columns=("sentiment",),
+            description="\nAnalyzing sentiment...",
+        ),
+        # Themes only need text/title, so they run alongside preprocessing and sentiment
+        Stage(
+            "themes",
+            lambda inputs, force: theme_detection.detect_themes(
+                inputs["scrape"], multi_label=multi_label_themes, incremental=incremental, overwrite=force
+            ),
+            inputs=["scrape"],
+            config={"multi_label": multi_label_themes, "keywords": theme_detection.THEME_KEYWORDS},
+            code=[theme_detection],
+            output_columns=("theme",),
+            description="\nDetecting themes...",
+        ),
+        Stage(
+            "join",
+            lambda inputs, force: theme_detection.join_themes(
+                inputs["sentiment"], inputs["themes"], multi_label=multi_label_themes, overwrite=force
+            ),
+            inputs=["sentiment", "themes"],
+            config={"multi_label": multi_label_themes},
+            code=[theme_detection.join_themes],
+            output_columns=("sentiment", "theme"),
+            description="\nJoining sentiment and themes...",
+        ),
+        # Counts the dashboard renders from, extended with each incremental run's new rows
+        Stage(
+            "aggregate",
+            lambda inputs, force: aggregates.build_aggregates(inputs["join"], incremental=incremental, overwrite=force),
+            inputs=["join"],
+            code=[aggregates],
+            output_columns=tuple(aggregates.CUBE_DIMENSIONS) + ("reviews",),
+            description="\nAggregating results for the dashboard...",
+        ),
+    ]
+
+
+def run_full_pipeline(site_to_review, multi_label_themes=False, incremental=False, max_workers=None, streaming=False,
+                      inference_workers=None, inference_threads=None, cascade_threshold=None, inference_pool=None):
+    """
+    Runs every stage for the site and returns the path of its results.
+    Sentiment is scored on `inference_pool` (a batch.InferencePool shared
+    with other runs, whose model, device, dtype and backend then apply), or
+    on a pool of `inference_workers` started for this run, or in this process.
+    """
+    if inference_workers and inference_pool is not None:
+        raise ValueError("Pass either inference_workers or inference_pool, not both")
+    with site_lock(site_to_review):
+        return _run_full_pipeline(site_to_review, multi_label_themes, incremental, max_workers, streaming,
+                                  inference_workers, inference_threads, cascade_threshold, inference_pool)
+
+
+def _run_full_pipeline(site_to_review, multi_label_themes, incremental, max_workers, streaming,
+                       inference_workers, inference_threads, cascade_threshold, inference_pool):
+    if streaming:
+        # Chunk-by-chunk single-label run; see mypipeline.streaming
+        if (multi_label_themes or incremental or inference_workers or inference_pool is not None
+                or cascade_threshold is not None):
+            raise ValueError(
+                "streaming mode supports neither multi_label_themes, incremental, inference_workers, "
+                "inference_pool nor cascade_threshold"
+            )
+        from .aggregates import build_aggregates
+        from .streaming import run_streaming_pipeline
+
+        final_path = run_streaming_pipeline(site_to_review)
+        build_aggregates(final_path)
+        index_results(site_to_review, final_path)
+        print("\nPipeline complete!")
+        return final_path
+
+    from .stages import StageGraph
+    from .storage import export_csv
+
+    with contextlib.ExitStack() as stack:
+        if inference_workers:
+            # Sentiment rows are sharded across worker processes; see mypipeline.batch
+            from .batch import InferencePool
+
+            inference_pool = stack.enter_context(InferencePool(inference_workers, threads=inference_threads))
+        model_options = {}
+        if inference_pool is not None:
+            # The pool's model settings go into the sentiment fingerprint
+            model_options = {"model_name": inference_pool.model_name, "device": inference_pool.device,
+                             "dtype": inference_pool.dtype, "backend": inference_pool.backend}
+        stages = build_stages(site_to_review, multi_label_themes=multi_label_themes, incremental=incremental,
+                              inference_pool=inference_pool, cascade_threshold=cascade_threshold, **model_options)
+        graph = StageGraph(stages, manifest_path(site_to_review), name=site_to_review,
+                           metrics_path=metrics_path(site_to_review))
+        outputs = graph.run(max_workers=max_workers)
+    final_path = outputs["join"]
+    index_results(site_to_review, final_path)
+
+    # Keep a CSV copy of the final results for export
+    if not final_path.endswith(".csv"):
+        print(f"Exported CSV copy to {export_csv(final_path)}")
+
     print("\nPipeline complete!")
-    return final_csv
\ No newline at end of file
+    return final_path
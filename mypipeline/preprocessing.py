@@ -1,39 +1,172 @@
-import pandas as pd
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
+import multiprocessing
+import numpy as np
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from .dates import normalize_dates
+from .reviews import REVIEW_KEY_COLUMNS, delta_rows
+from .storage import artifact_exists, artifact_path, derive_artifact, read_artifact, store_for, write_artifact
+
+# NLTK data needed by preprocess_text, as (download id, nltk.data path)
+NLTK_RESOURCES = [
+    ("punkt", "tokenizers/punkt"),
+    ("punkt_tab", "tokenizers/punkt_tab"),
+    ("stopwords", "corpora/stopwords"),
+    ("wordnet", "corpora/wordnet"),
+]
+
+# Upper bound on distinct tokens whose lemma is memoized per process
+LEMMA_CACHE_SIZE = 50_000
+
+# Below this many rows a process pool costs more than it saves
+MIN_ROWS_PER_WORKER = 200
+
+_stop_words = None
+_lemmatize = None
+_tokenize = None
+_resources_lock = threading.Lock()
+
+
+def ensure_nltk_resources():
+    """
+    Checks the local NLTK data and downloads only what is missing, so runs
+    with everything already installed never touch the network.
+    """
+    import nltk
+
+    def installed(path):
+        # Some corpora (e.g. wordnet) may be left zipped by the downloader
+        for candidate in (path, path + ".zip"):
+            try:
+                nltk.data.find(candidate)
+                return True
+            except LookupError:
+                pass
+        return False
+
+    for resource, path in NLTK_RESOURCES:
+        if installed(path):
+            continue
+        nltk.download(resource, quiet=True)
+        if not installed(path):
+            raise LookupError(
+                f"NLTK resource '{resource}' is not installed and could not be downloaded. "
+                f"Run nltk.download('{resource}') with network access."
+            )
+
+
+def _load_resources():
+    # Built once per process (and once per pool worker via the initializer).
+    # Stage and site threads can get here together, and NLTK's lazy corpus
+    # loading is not thread-safe, so one thread builds everything and
+    # _stop_words, the flag the others check, is set last
+    global _stop_words, _lemmatize, _tokenize
+    if _stop_words is not None:
+        return
+    with _resources_lock:
+        if _stop_words is not None:
+            return
+        ensure_nltk_resources()
+        from nltk.corpus import stopwords
+        from nltk.stem import WordNetLemmatizer
+        from nltk.tokenize import word_tokenize
+
+        stop_words = frozenset(stopwords.words("english"))
+        lemmatize = lru_cache(maxsize=LEMMA_CACHE_SIZE)(WordNetLemmatizer().lemmatize)
+        # Loads the lazy wordnet corpus now, inside the lock
+        lemmatize("reviews")
+        _tokenize = word_tokenize
+        _lemmatize = lemmatize
+        _stop_words = stop_words
+
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
 
-nltk.download(['punkt', 'stopwords', 'punkt_tab', 'wordnet'], quiet=True)
 
 def preprocess_text(text):
-    stop_words = set(stopwords.words("english"))
-    lemmatizer = WordNetLemmatizer()
+    _load_resources()
     
-    words = word_tokenize(str(text).lower())
+    words = _tokenize(str(text).lower())
     processed_words = [
-        lemmatizer.lemmatize(word) for word in words
-        if word.isalnum() and word not in stop_words
+        _lemmatize(word) for word in words
+        if word.isalnum() and word not in _stop_words
     ]
     return " ".join(processed_words)
 
-def preprocess_reviews(input_csv):
-    output_csv = input_csv.replace(".csv", "_processed.csv")
+
+def _preprocess_chunk(texts):
+    return [preprocess_text(text) for text in texts]
+
+
+def preprocess_texts(texts, workers=None):
+    """
+    Preprocesses `texts` across a process pool and returns the results in input order.
+    """
+    texts = list(texts)
+    # Check NLTK data once up front instead of failing inside every worker
+    _load_resources()
+    workers = min(workers or available_cores(), max(1, len(texts) // MIN_ROWS_PER_WORKER))
+    if workers <= 1:
+        return _preprocess_chunk(texts)
+
+    # A few shards per worker keeps the pool busy when review lengths vary
+    shard_size = -(-len(texts) // (workers * 4))
+    shards = [texts[i:i + shard_size] for i in range(0, len(texts), shard_size)]
+    # Spawned rather than forked: stage and site threads may be running alongside
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_load_resources) as executor:
+        return [text for shard in executor.map(_preprocess_chunk, shards) for text in shard]
+
+
+def backfill_date_utc(output_path):
+    # Processed files from before date_utc existed (e.g. the bundled CSVs) are
+    # adopted as they are, so the column is added to them once here
+    if "date_utc" in store_for(output_path).column_names(output_path):
+        return
+    df = read_artifact(output_path)
+    df["date_utc"] = normalize_dates(df["date"], record=False).set_axis(df.index)
+    write_artifact(df, output_path)
+    print(f"Added date_utc to {output_path}")
+
+
+def preprocess_reviews(input_path, incremental=False, workers=None, overwrite=False):
+    output_path = artifact_path(input_path, "_processed")
     
     # Check if the output file already exists
-    if os.path.exists(output_csv):
-        print(f"Processed file {output_csv} already exists. Skipping processing.")
-        return output_csv
+    has_output = artifact_exists(output_path) and not overwrite
+    if has_output:
+        backfill_date_utc(output_path)
+    if has_output and not incremental:
+        print(f"Processed file {output_path} already exists. Skipping processing.")
+        return output_path
     
-    df = pd.read_csv(input_csv)
+    # Only the text (and, incrementally, the review key) is read here; the
+    # other columns are carried over by derive_artifact
+    df = read_artifact(input_path, columns=["text", "date"] + (REVIEW_KEY_COLUMNS if incremental else []))
     
     if "text" not in df.columns:
         raise ValueError("CSV must contain 'text' column")
     
-    print("Preprocessing reviews...")
-    df["processed_text"] = df["text"].apply(preprocess_text)
+    # In incremental mode only rows missing from the previous output are processed
+    rows = delta_rows(df, output_path) if incremental else np.arange(len(df))
+    if has_output and incremental and len(rows) == 0:
+        print(f"Processed file {output_path} is up to date.")
+        return output_path
+    
+    print(f"Preprocessing {len(rows)} reviews...")
+    processed_text = preprocess_texts(df["text"].iloc[rows].tolist(), workers=workers)
+    
+    # Dates are parsed once here and carried downstream as a typed UTC column
+    date_utc = normalize_dates(df["date"].iloc[rows], record=False)
     
-    df.to_csv(output_csv, index=False)
-    print(f"Preprocessed data saved to {output_csv}")
-    return output_csv
\ No newline at end of file
+    derive_artifact(
+        input_path, output_path, rows, {"processed_text": processed_text, "date_utc": date_utc},
+        append=has_output and incremental,
+    )
+    print(f"Preprocessed data saved to {output_path}")
+    return output_path
@@ -0,0 +1,241 @@
+"""
+Every site's results in one indexed SQLite database, for filtered and
+cross-site queries that would otherwise scan each site's results file.
+
+`reviews` holds one row per review, indexed on site, date, country,
+sentiment and theme. `counts` holds review counts by site x month x
+country x rating x sentiment x theme, a small fraction of the rows; counts
+and totals are answered from it whenever the date range falls on month
+boundaries, since grouping every matching review row is what makes SQLite
+slow at this size. After each successful run, run_full_pipeline (and the
+batch runner) calls pipeline.index_results, which replaces the site's rows
+in both. Dates are UTC DATE_FORMAT strings, so ranges compare as text.
+
+The (site, review_key) primary key keeps one row per review, so for
+multi-label runs only the primary `theme` column is indexed; the per-theme
+hit counts stay in the run's theme hits artifact.
+"""
+import contextlib
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from .aggregates import result_dates
+from .dates import DATE_FORMAT
+from .reviews import review_keys
+from .storage import read_artifact
+
+DEFAULT_STORE_PATH = os.path.join("data", "reviews.sqlite")
+
+# Columns counts() can group by; all but hour are in the counts table
+DIMENSIONS = ("site", "month", "hour", "country", "rating", "sentiment", "theme")
+COUNT_DIMENSIONS = ("site", "month", "country", "rating", "sentiment", "theme")
+
+_COLUMNS = ("site", "review_key", "date", "month", "hour", "country", "rating", "sentiment", "theme", "title", "text")
+
+_INDEXES = {
+    "reviews_site_date": "site, date",
+    "reviews_date": "date",
+    "reviews_country": "country, date",
+    "reviews_sentiment": "sentiment, date",
+    "reviews_theme": "theme, date",
+}
+
+
+def _date_bound(value):
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+    return timestamp.strftime(DATE_FORMAT)
+
+
+def _month_bound(value):
+    # The month a date bound starts, or None if it is not the start of a month
+    bound = _date_bound(value)
+    return bound[:7] if bound.endswith("-01 00:00:00") else None
+
+
+def _where(sites=None, start=None, end=None, countries=None, ratings=None, sentiments=None, themes=None,
+           monthly=False):
+    # None or an empty list leaves a column unfiltered; `monthly` compares
+    # month-aligned bounds against the month column of the counts table
+    clauses, params = [], []
+    for column, values in (("site", sites), ("country", countries), ("rating", ratings),
+                           ("sentiment", sentiments), ("theme", themes)):
+        if values:
+            values = [int(value) for value in values] if column == "rating" else list(values)
+            clauses.append(f"{column} IN ({','.join('?' * len(values))})")
+            params.extend(values)
+    column, bound = ("month", _month_bound) if monthly else ("date", _date_bound)
+    if start is not None:
+        clauses.append(f"{column} >= ?")
+        params.append(bound(start))
+    if end is not None:
+        clauses.append(f"{column} < ?")
+        params.append(bound(end))
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+class ReviewStore:
+    """
+    Query API over the review table at `path`. Each call opens its own
+    connection, so one store can be shared by threads and sessions.
+
+    Query methods take the same filters: sites, countries, ratings,
+    sentiments and themes (lists of allowed values) and a start <= date <
+    end range (dates, datetimes or strings, in UTC).
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._transaction() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS reviews (site TEXT NOT NULL, review_key TEXT NOT NULL, date TEXT, "
+                "month TEXT, hour INTEGER, country TEXT, rating INTEGER, sentiment TEXT, theme TEXT, title TEXT, "
+                "text TEXT, PRIMARY KEY (site, review_key))"
+            )
+            for name, columns in _INDEXES.items():
+                connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON reviews ({columns})")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS counts (site TEXT NOT NULL, month TEXT, country TEXT, rating INTEGER, "
+                "sentiment TEXT, theme TEXT, reviews INTEGER NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS counts_site_month ON counts (site, month)")
+            # The results file each site was last loaded from, to skip reloading it unchanged
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sources (site TEXT PRIMARY KEY, results_path TEXT NOT NULL, "
+                "fingerprint TEXT NOT NULL, loaded REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        # A long timeout: loading a large site holds the write lock for seconds (reads never wait in WAL mode)
+        return sqlite3.connect(self.path, timeout=300)
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        connection = self._connect()
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _query(self, sql, params=()):
+        connection = self._connect()
+        try:
+            return pd.read_sql_query(sql, connection, params=params)
+        finally:
+            connection.close()
+
+    def load_results(self, site_to_review, results_path, overwrite=False):
+        """
+        Replaces the site's rows with the rows of `results_path` and returns
+        how many were written, unless they were already loaded from that file
+        as it is now. Readers see either the old or the new rows.
+        """
+        stat = os.stat(results_path)
+        fingerprint = f"{stat.st_mtime_ns}:{stat.st_size}"
+        source = self._query("SELECT results_path, fingerprint FROM sources WHERE site = ?", (site_to_review,))
+        if not overwrite and not source.empty and tuple(source.iloc[0]) == (results_path, fingerprint):
+            print(f"{self.path} is up to date for {site_to_review}. Skipping indexing.")
+            return 0
+
+        df = read_artifact(results_path)
+        dates = result_dates(df).dt.tz_convert("UTC").dt.tz_localize(None)
+        rows = pd.DataFrame({
+            "site": site_to_review,
+            "review_key": review_keys(df),
+            "date": dates.dt.strftime(DATE_FORMAT),
+            "month": dates.dt.strftime("%Y-%m"),
+            "hour": dates.dt.hour.astype("Int64"),
+            "country": df["country"].astype(object),
+            "rating": df["rating"].astype("Int64"),
+            "sentiment": df["sentiment"].astype(object),
+            "theme": df["theme"].astype(object),
+            "title": df["title"].astype(object),
+            "text": df["text"].astype(object),
+        })
+        # Missing values go to SQLite as NULL
+        rows = rows.astype(object).where(rows.notna(), None)
+        # The same review can appear on two pages of one scrape
+        rows = rows.drop_duplicates("review_key")
+
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM reviews WHERE site = ?", (site_to_review,))
+            connection.executemany(
+                f"INSERT INTO reviews ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                rows.itertuples(index=False, name=None),
+            )
+            dimensions = ", ".join(COUNT_DIMENSIONS)
+            connection.execute("DELETE FROM counts WHERE site = ?", (site_to_review,))
+            connection.execute(
+                f"INSERT INTO counts SELECT {dimensions}, COUNT(*) FROM reviews WHERE site = ? GROUP BY {dimensions}",
+                (site_to_review,),
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO sources (site, results_path, fingerprint, loaded) VALUES (?, ?, ?, ?)",
+                (site_to_review, results_path, fingerprint, time.time()),
+            )
+            connection.execute("ANALYZE")
+        print(f"Indexed {len(rows)} reviews for {site_to_review} in {self.path}")
+        return len(rows)
+
+    def sites(self):
+        return self._query("SELECT DISTINCT site FROM counts ORDER BY site")["site"].tolist()
+
+    def options(self, sites=None):
+        """
+        Returns the values each filter can take for `sites` (all sites by
+        default): {"months": [...], "countries": [...], "ratings": [...],
+        "sentiments": [...], "themes": [...]}, each sorted.
+        """
+        where, params = _where(sites=sites)
+        options = {}
+        for name, column in (("months", "month"), ("countries", "country"), ("ratings", "rating"),
+                             ("sentiments", "sentiment"), ("themes", "theme")):
+            options[name] = self._query(
+                f"SELECT DISTINCT {column} FROM counts{where} ORDER BY {column}", params
+            )[column].dropna().tolist()
+        return options
+
+    def _source(self, by, filters):
+        # The counts table when it can answer the query exactly, else the review rows
+        monthly = "hour" not in by and all(
+            filters.get(name) is None or _month_bound(filters[name]) for name in ("start", "end")
+        )
+        where, params = _where(**filters, monthly=monthly)
+        return ("counts", "SUM(reviews)") if monthly else ("reviews", "COUNT(*)"), where, params
+
+    def total(self, **filters):
+        (table, count), where, params = self._source((), filters)
+        return int(self._query(f"SELECT COALESCE({count}, 0) AS reviews FROM {table}{where}", params).loc[0, "reviews"])
+
+    def counts(self, by, **filters):
+        """
+        Returns review counts grouped by the DIMENSIONS in `by`, as a
+        DataFrame with those columns and `reviews`.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        unknown = [column for column in by if column not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Cannot group by {unknown}; choose from {DIMENSIONS}")
+        (table, count), where, params = self._source(by, filters)
+        columns = ", ".join(by)
+        return self._query(
+            f"SELECT {columns}, {count} AS reviews FROM {table}{where} GROUP BY {columns} ORDER BY {columns}", params
+        )
+
+    def sample(self, limit=20, **filters):
+        """
+        Returns up to `limit` matching reviews, newest first.
+        """
+        where, params = _where(**filters)
+        return self._query(
+            f"SELECT site, date, country, rating, sentiment, theme, title, text FROM reviews{where} "
+            "ORDER BY date DESC LIMIT ?",
+            params + [limit],
+        )
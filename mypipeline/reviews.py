@@ -0,0 +1,64 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from .storage import artifact_path, read_artifact, store_for, write_artifact
+
+# Columns that identify a review across re-scrapes and stage outputs
+REVIEW_KEY_COLUMNS = ["date", "country", "title", "text"]
+
+
+def review_keys(df):
+    """
+    Returns a stable key per row, hashed from REVIEW_KEY_COLUMNS, that survives
+    CSV round trips and is carried by every stage output.
+    """
+    parts = df[REVIEW_KEY_COLUMNS].astype(object).where(df[REVIEW_KEY_COLUMNS].notna(), "")
+    columns = [parts[column].astype(str).str.strip() for column in REVIEW_KEY_COLUMNS]
+    # Column-wise concatenation; a row-wise join is ~30x slower
+    joined = columns[0].str.cat(columns[1:], sep="\x1f")
+    return joined.map(lambda value: hashlib.sha1(value.encode("utf-8")).hexdigest())
+
+
+def processed_keys_path(output_path):
+    return artifact_path(output_path, "_keys", store_for(output_path))
+
+
+def processed_keys(output_path):
+    """
+    Returns the keys of every input row a stage has already handled: from
+    its keys sidecar if it records one (stages that drop rows from their
+    output do), else from the rows of the output itself.
+    """
+    keys_path = processed_keys_path(output_path)
+    if os.path.exists(keys_path):
+        return set(read_artifact(keys_path)["review_key"])
+    if not os.path.exists(output_path):
+        return set()
+    previous = read_artifact(output_path, columns=REVIEW_KEY_COLUMNS)
+    return set(review_keys(previous)) if not previous.empty else set()
+
+
+def record_processed_keys(output_path, keys, append=False):
+    """
+    Writes the keys sidecar of a stage that leaves some input rows out of
+    its output, so delta_rows does not offer those rows again on every run.
+    With `append`, `keys` are added to the keys already handled.
+    """
+    keys = list(keys)
+    if append:
+        keys = list(processed_keys(output_path)) + keys
+    write_artifact(pd.DataFrame({"review_key": list(dict.fromkeys(keys))}), processed_keys_path(output_path))
+
+
+def delta_rows(input_df, output_path):
+    """
+    Returns the positions of rows in `input_df` whose key the stage writing
+    `output_path` has not handled yet (all rows if there is no output yet).
+    """
+    known = processed_keys(output_path)
+    if not known:
+        return np.arange(len(input_df))
+    return np.flatnonzero(~review_keys(input_df).isin(known).to_numpy())
@@ -1,79 +1,226 @@
-import requests
-from bs4 import BeautifulSoup
 import csv
+import multiprocessing
 import os
-import dateparser
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from .dates import date_counts, report_date_counts
+from .extraction import missing_selectors, parse_last_page_number, parse_reviews
+from .http_client import DEFAULT_HEADERS, PageFetcher
+from .page_archive import DEFAULT_ARCHIVE_PATH, PageArchive, decompress
+from .preprocessing import available_cores
+from .reviews import review_keys
 # from transformers import pipeline
 
 # # Initialize the summarization model
 # summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
 
-def scrape_trustpilot_reviews(site_to_review):
-    base_url = f"https://www.trustpilot.com/review/{site_to_review}?page="
-    csv_filename = os.path.join("data", site_to_review.replace('.', '_') + ".csv")  # Save in /data folder    
+TRUSTPILOT_BASE_URL = "https://www.trustpilot.com/review/"
+
+# Below this many archived pages a process pool costs more than it saves
+MIN_PAGES_PER_WORKER = 20
+
+
+def iter_pages(fetcher, page_url, first_page, last_page_number):
+    """
+    Yields (page number, html) in page order, fetching a window of
+    `fetcher.max_workers` pages at a time, only as the caller consumes them.
+    html is None for pages that failed after retries.
+    """
+    yield 1, first_page
+    for start in range(2, last_page_number + 1, fetcher.max_workers):
+        window = range(start, min(start + fetcher.max_workers, last_page_number + 1))
+        for page, html in zip(window, fetcher.fetch_all([f"{page_url}{n}" for n in window])):
+            yield page, html
+
+
+def _scrape_newer_than(fetcher, page_url, first_page, last_page_number, newest_date):
+    """
+    Walks pages newest-first and stops at the first page whose reviews are
+    all older than `newest_date`.
+    """
+    reviews = []
+    for page, html in iter_pages(fetcher, page_url, first_page, last_page_number):
+        if html is None:
+            print(f"Skipping page {page}: fetch failed after retries.")
+            continue
+        print(f"Scraping page {page}...")
+        page_reviews = parse_reviews(html)
+        reviews.extend(page_reviews)
+        page_dates = pd.to_datetime([r["date"] for r in page_reviews], errors="coerce")
+        if len(page_dates) and (page_dates < newest_date).all():
+            break
+    return reviews
 
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
-
-    def scrape_page(page_number):
-        url = f"{base_url}{page_number}"
-        response = requests.get(url, headers=headers)
-        soup = BeautifulSoup(response.text, "html.parser")
-        reviews = []
-
-        review_sections = soup.find_all("section", class_="styles_reviewContentwrapper__W9Vqf")
-        for review in review_sections:
-            try:
-                rating_tag = review.find("div", class_="star-rating_starRating__sdbkn")
-                rating = int(rating_tag.img["alt"].split()[1]) if rating_tag and rating_tag.img else None
-
-                title_tag = review.find("h2", class_="typography_heading-s__RxVny")
-                title = title_tag.text.strip() if title_tag else None
-
-                text_tag = review.find("p", class_="typography_body-l__v5JLj")
-                text = text_tag.text.strip() if text_tag else None
-
-                date_tag = review.find("time")
-                date = date_tag.get("datetime") if date_tag else None
-
-                country_tag = review.find_previous("div", class_="typography_body-m__k2UI7 typography_appearance-subtle__PYOVM styles_detailsIcon__ch_FY")
-                country = country_tag.find("span").text.strip() if country_tag else None
-
-                if rating and title and text and date and country:
-                    # Remove "Updated " from the text and parse dates
-                    if "Updated " in date:
-                        date = date.replace("Updated ", "")
-                    parsed_date = dateparser.parse(date)
-                    if parsed_date:
-                        date = parsed_date.strftime("%Y-%m-%d %H:%M:%S")
-                        
-                    reviews.append({
-                        "rating": rating,
-                        "title": title,
-                        "text": text,
-                        "date": date,
-                        "country": country
-                    })
-            except Exception as e:
-                # print(f"Error extracting review: {e}")
-                pass
-        return reviews
+
+def _write_reviews(csv_filename, reviews, append=False):
+    with open(csv_filename, "a" if append else "w", newline='', encoding="utf-8") as f:
+        # writer = csv.DictWriter(f, fieldnames=["rating", "title", "text", "date", "country", "summarized_text"])
+        writer = csv.DictWriter(f, fieldnames=["rating", "title", "text", "date", "country"])
+        if not append:
+            writer.writeheader()
+        writer.writerows(reviews)
+
+
+def _archived_page_number(url):
+    page = parse_qs(urlsplit(url).query).get("page", ["0"])[0]
+    return int(page) if page.isdigit() else 0
+
+
+def _extract_archived(body):
+    return parse_reviews(decompress(body))
+
+
+def reextract_reviews(site_to_review, base_url=TRUSTPILOT_BASE_URL, archive_path=DEFAULT_ARCHIVE_PATH, workers=None):
+    """
+    Rebuilds the site's raw CSV from the latest archived copy of each of its
+    pages, re-running extraction across a process pool without touching the
+    network, and returns the CSV path. Pages archived at different times can
+    overlap, so each review is kept once.
+
+    The CSV is only replaced outright when the archive covers every review
+    already in it. Otherwise (reviews scraped before the archive existed, or
+    that moved between pages archived at different times) the re-extracted
+    reviews are merged into it by review key, and the reviews the archive
+    does not cover are kept as they were and reported.
+    """
+    page_url = f"{base_url}{site_to_review}?page="
+    csv_filename = os.path.join("data", site_to_review.replace('.', '_') + ".csv")
+
+    with PageArchive(archive_path) as archive:
+        pages = sorted(archive.latest_pages(page_url), key=lambda page: _archived_page_number(page[0]))
+    if not pages:
+        raise ValueError(f"No archived pages for {site_to_review} in {archive_path}")
+
+    bodies = [body for _, body in pages]
+    workers = min(workers or available_cores(), max(1, len(bodies) // MIN_PAGES_PER_WORKER))
+    print(f"Re-extracting {len(bodies)} archived pages with {workers} workers...")
+    if workers <= 1:
+        extracted = [_extract_archived(body) for body in bodies]
+    else:
+        # Spawned rather than forked: stage and site threads may be running alongside
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            extracted = list(executor.map(_extract_archived, bodies, chunksize=8))
+
+    all_reviews = [review for page_reviews in extracted for review in page_reviews]
+    if not all_reviews:
+        missing = missing_selectors(decompress(bodies[0]))
+        raise ValueError(f"No reviews extracted for {site_to_review} from the archive. "
+                         f"Selectors matching nothing on page 1: {missing}")
+    keys = review_keys(pd.DataFrame(all_reviews, columns=["rating", "title", "text", "date", "country"]))
+    reviews = [review for review, duplicate in zip(all_reviews, keys.duplicated()) if not duplicate]
+    extracted_count = len(reviews)
 
     if os.path.exists(csv_filename):
-        print(f"{csv_filename} already exists. Skipping scraping.")
-        return csv_filename
+        # Strings as written, so kept rows are rewritten unchanged
+        existing = pd.read_csv(csv_filename, dtype=str, keep_default_na=False)
+        uncovered = existing[~review_keys(existing).isin(set(keys)).to_numpy()]
+        if not uncovered.empty:
+            print(f"{len(uncovered)} of {len(existing)} reviews in {csv_filename} are not in the archive; "
+                  f"keeping them as they are:")
+            for _, row in uncovered.head(10).iterrows():
+                print(f"  {row['date']} {row['title'][:60]!r}")
+            if len(uncovered) > 10:
+                print(f"  ... and {len(uncovered) - 10} more")
+            reviews += uncovered.to_dict("records")
+            # Newest first, like a fresh scrape
+            dates = pd.to_datetime(pd.Series([review["date"] for review in reviews]), errors="coerce", utc=True)
+            reviews = [reviews[i] for i in dates.sort_values(ascending=False, kind="stable").index]
+
+    # Written aside and swapped in, so a failed run leaves the previous CSV intact
+    _write_reviews(csv_filename + ".tmp", reviews)
+    os.replace(csv_filename + ".tmp", csv_filename)
+    print(f"Re-extracted {extracted_count} reviews from the archive into {csv_filename} "
+          f"({len(reviews)} reviews in total)")
+    return csv_filename
 
-    response = requests.get(base_url + "1", headers=headers)
-    soup = BeautifulSoup(response.text, "html.parser")
 
-    pagination_button = soup.find("a", {"name": "pagination-button-last"})
-    last_page_number = int(pagination_button["aria-label"].split()[-1]) if pagination_button else 1
+def scrape_trustpilot_reviews(site_to_review, base_url=TRUSTPILOT_BASE_URL, max_workers=8,
+                              requests_per_second=5.0, max_retries=3, timeout=30, incremental=False,
+                              archive_path=DEFAULT_ARCHIVE_PATH, reextract=False):
+    """
+    Scrapes every review page of the site into data/<site>.csv and returns
+    its path; an existing CSV is kept as is, or only extended with newer
+    reviews when `incremental`.
 
+    Fetched pages go to the page archive at `archive_path` (None disables
+    it). With `reextract`, the CSV is first rebuilt offline from the
+    archived pages, if there are any, by reextract_reviews.
+    """
+    page_url = f"{base_url}{site_to_review}?page="
+    csv_filename = os.path.join("data", site_to_review.replace('.', '_') + ".csv")  # Save in /data folder    
+
+    if reextract and archive_path:
+        with PageArchive(archive_path) as archive:
+            archived = archive.count(page_url)
+        if archived:
+            reextract_reviews(site_to_review, base_url=base_url, archive_path=archive_path)
+        else:
+            print(f"No archived pages for {site_to_review} to re-extract.")
+
+    existing = None
+    if os.path.exists(csv_filename):
+        if not incremental:
+            print(f"{csv_filename} already exists. Skipping scraping.")
+            return csv_filename
+        existing = pd.read_csv(csv_filename)
+
+    dates_before = date_counts()
+    archive = PageArchive(archive_path) if archive_path else None
+    fetcher = PageFetcher(
+        headers=DEFAULT_HEADERS,
+        max_workers=max_workers,
+        requests_per_second=requests_per_second,
+        max_retries=max_retries,
+        timeout=(5, timeout),
+        archive=archive,
+    )
+    try:
+        with fetcher:
+            first_page = fetcher.fetch(page_url + "1")
+            last_page_number = parse_last_page_number(first_page)
+
+            if existing is not None and not existing.empty:
+                newest_date = pd.to_datetime(existing["date"], errors="coerce").max()
+                print(f"Scraping reviews newer than {newest_date}...")
+                scraped = _scrape_newer_than(fetcher, page_url, first_page, last_page_number, newest_date)
+
+                # Keep only reviews not already on disk, once each
+                scraped_df = pd.DataFrame(scraped, columns=["rating", "title", "text", "date", "country"])
+                keys = review_keys(scraped_df)
+                is_new = ~keys.isin(set(review_keys(existing))) & ~keys.duplicated()
+                new_reviews = [review for review, keep in zip(scraped, is_new) if keep]
+
+                _write_reviews(csv_filename, new_reviews, append=True)
+                print(f"Appended {len(new_reviews)} new reviews to {csv_filename}")
+                report_date_counts(since=dates_before)
+                return csv_filename
+
+            print(f"Scraping {last_page_number} pages with {max_workers} workers...")
+            urls = [f"{page_url}{page}" for page in range(2, last_page_number + 1)]
+            pages = [first_page] + fetcher.fetch_all(urls)
+    finally:
+        if archive is not None:
+            archive.report()
+            archive.close()
+
+    # Pages come back in page order, so the CSV keeps Trustpilot's ordering
     all_reviews = []
-    for page in range(1, last_page_number + 1):
-        print(f"Scraping page {page}...")
-        all_reviews.extend(scrape_page(page))
+    for page, html in enumerate(pages, start=1):
+        if html is None:
+            print(f"Skipping page {page}: fetch failed after retries.")
+            continue
+        page_reviews = parse_reviews(html)
+        if not page_reviews:
+            print(f"Warning: page {page} produced no reviews.")
+        all_reviews.extend(page_reviews)
+
+    if not all_reviews:
+        # Most likely Trustpilot changed its markup; see extraction.SELECTORS
+        missing = missing_selectors(first_page)
+        raise ValueError(f"No reviews extracted for {site_to_review}. Selectors matching nothing on page 1: {missing}")
 
     # # Summarize the reviews
     # print("Summarizing reviews...")
@@ -85,11 +232,8 @@ def scrape_trustpilot_reviews(site_to_review):
     #         review["summarized_text"] = None
     # print("Summarized all reviews.")
 
-    with open(csv_filename, "w", newline='', encoding="utf-8") as f:
-        # writer = csv.DictWriter(f, fieldnames=["rating", "title", "text", "date", "country", "summarized_text"])
-        writer = csv.DictWriter(f, fieldnames=["rating", "title", "text", "date", "country"])
-        writer.writeheader()
-        writer.writerows(all_reviews)
+    _write_reviews(csv_filename, all_reviews)
 
     print(f"Scraped reviews and saved to {csv_filename}")
+    report_date_counts(since=dates_before)
     return csv_filename
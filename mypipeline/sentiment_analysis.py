@@ -1,48 +1,139 @@
-import pandas as pd
-import os
-from transformers import pipeline
+import numpy as np
 
-def analyze_sentiment(input_csv):
-    output_csv = input_csv.replace(".csv", "_with_sentiment.csv")
-    pie_chart_data_path = os.path.join("streamlit_folder", "pie_chart_data.csv")
-    
-    # Create the streamlit_folder if it doesn't exist
-    os.makedirs("streamlit_folder", exist_ok=True)
-    
-    if os.path.exists(output_csv):
-        print(f"{output_csv} already exists. Skipping sentiment analysis.")
-        return output_csv
+from .cascade import first_stage
+from .inference import BatchedSentimentEngine, DEFAULT_BATCH_SIZE
+from .instrumentation import emit
+from .backends import default_backend
+from .model_registry import DEFAULT_MODEL_NAME, get_model, model_revision
+from .reviews import REVIEW_KEY_COLUMNS, delta_rows
+from .sentiment_cache import DEFAULT_CACHE_PATH, SentimentCache, cache_key
+from .storage import artifact_exists, artifact_path, derive_artifact, read_artifact
 
-    df = pd.read_csv(input_csv)
-    
-    # Drop rows where 'processed_text' is NaN
-    df = df.dropna(subset=["processed_text"])
+MODEL_NAME = DEFAULT_MODEL_NAME
+
+# Map model labels to human-readable labels
+LABEL_MAP = {"LABEL_0": "NEGATIVE", "LABEL_1": "NEUTRAL", "LABEL_2": "POSITIVE"}
+
+
+class LazyModel:
+    """
+    Stands in for a ModelHandle in score_texts, with the model's name and
+    revision but no weights until predict is first called, so runs answered
+    entirely from the sentiment cache never load the model.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, device="cpu", dtype="float32", backend=None,
+                 batch_size=DEFAULT_BATCH_SIZE):
+        self.model_name = model_name
+        self.device = device
+        self.dtype = dtype
+        self.backend = backend or default_backend()
+        self.batch_size = batch_size
+        self.revision = model_revision(model_name, backend=self.backend, dtype=dtype)
+
+    def predict(self, texts):
+        handle = get_model(self.model_name, device=self.device, dtype=self.dtype, backend=self.backend)
+        return BatchedSentimentEngine(handle.tokenizer, handle.model, batch_size=self.batch_size).predict(texts)
+
+
+def score_texts(texts, handle, batch_size=DEFAULT_BATCH_SIZE, cache=None):
+    """
+    Returns a sentiment label per text, or None where the model failed.
+
+    `handle` is a ModelHandle, or anything else with model_name, revision and
+    predict(texts), such as a batch.InferencePool. Each distinct text is
+    scored once, and only if `cache` (a SentimentCache) does not already hold
+    its label.
+    """
+    keys = [cache_key(text, handle.model_name, handle.revision) for text in texts]
+    labels = cache.get_many(keys) if cache else {}
+    to_score = {key: text for key, text in zip(keys, texts) if key not in labels}
+    if to_score:
+        predict = getattr(handle, "predict", None)
+        if predict is None:
+            predict = BatchedSentimentEngine(handle.tokenizer, handle.model, batch_size=batch_size).predict
+        scored_labels = predict(list(to_score.values()))
+        new_labels = {key: label for key, label in zip(to_score, scored_labels) if label is not None}
+        labels.update(new_labels)
+        if cache:
+            cache.put_many(new_labels.items())
+    print(f"Scored {len(to_score)} distinct texts for {len(texts)} rows")
+    return [LABEL_MAP.get(labels[key], "UNKNOWN") if key in labels else None for key in keys]
+
+
+def cascade_labels(ratings, texts, threshold, score):
+    """
+    Returns a label per review: the first-stage label (see mypipeline.cascade)
+    where its confidence is at least `threshold`, else score(texts) for the
+    remaining texts. score is only called if some reviews remain.
+    """
+    labels, confidences = first_stage(ratings, texts)
+    uncertain = np.flatnonzero(confidences < threshold)
+    if len(uncertain):
+        for i, label in zip(uncertain, score([texts[i] for i in uncertain])):
+            labels[i] = label
+    first_stage_rows = len(texts) - len(uncertain)
+    print(f"Cascade: {first_stage_rows} rows labelled from rating and lexicon, "
+          f"{len(uncertain)} sent to the model (threshold {threshold})")
+    emit("cascade", threshold=threshold, first_stage=first_stage_rows, model=int(len(uncertain)),
+         first_stage_share=first_stage_rows / len(texts) if len(texts) else None)
+    return labels
+
+
+def analyze_sentiment(input_path, batch_size=DEFAULT_BATCH_SIZE, device="cpu", dtype="float32", incremental=False,
+                      cache_path=DEFAULT_CACHE_PATH, overwrite=False, inference_pool=None, backend=None,
+                      cascade_threshold=None, model_name=MODEL_NAME):
+    """
+    Adds a sentiment column to the processed reviews. With
+    `cascade_threshold`, reviews the rating/lexicon first stage is confident
+    about are labelled without the model (see mypipeline.cascade).
+    """
+    output_path = artifact_path(input_path, "_with_sentiment")
+    has_output = artifact_exists(output_path) and not overwrite
+    if has_output and not incremental:
+        print(f"{output_path} already exists. Skipping sentiment analysis.")
+        return output_path
+
+    columns = ["processed_text"] + (["rating"] if cascade_threshold is not None else [])
+    df = read_artifact(input_path, columns=columns + (REVIEW_KEY_COLUMNS if incremental else []))
     
-    # Initialize the sentiment analyzer
-    sentiment_analyzer = pipeline(
-        "sentiment-analysis", 
-        model="cardiffnlp/twitter-roberta-base-sentiment"
-    )
+    # In incremental mode only rows missing from the previous output are scored
+    rows = delta_rows(df, output_path) if incremental else np.arange(len(df))
     
-    # Map model labels to human-readable labels
-    label_map = {"LABEL_0": "NEGATIVE", "LABEL_1": "NEUTRAL", "LABEL_2": "POSITIVE"}
+    # Drop rows where 'processed_text' is NaN
+    rows = rows[df["processed_text"].iloc[rows].notna().to_numpy()]
+    if has_output and incremental and len(rows) == 0:
+        print(f"{output_path} is up to date.")
+        return output_path
     
-    def get_sentiment(text):
-        try:
-            result = sentiment_analyzer(text[:512])[0]  # Truncate to 512 tokens
-            return label_map.get(result["label"], "UNKNOWN")
-        except Exception as e:
-            # Suppress the error message
-            return None  # Return None for failed analyses
+    def score(texts):
+        # The process-wide model handle, only loaded if some texts miss the
+        # cache, unless the batch runner shares its inference workers with this run
+        handle = inference_pool or LazyModel(model_name, device=device, dtype=dtype, backend=backend,
+                                             batch_size=batch_size)
+        return score_texts(texts, handle, batch_size=batch_size, cache=cache)
     
     print("Analyzing sentiment...")
-    df["sentiment"] = df["processed_text"].apply(get_sentiment)
+    texts = df["processed_text"].iloc[rows].tolist()
+    cache = SentimentCache(cache_path) if cache_path else None
+    try:
+        if cascade_threshold is None:
+            sentiments = score(texts)
+        else:
+            sentiments = cascade_labels(df["rating"].iloc[rows].tolist(), texts, cascade_threshold, score)
+    finally:
+        if cache:
+            cache.report()
+            cache.close()
     
     # Drop rows where sentiment analysis failed (None values)
-    df = df.dropna(subset=["sentiment"])
+    scored = [i for i, sentiment in enumerate(sentiments) if sentiment is not None]
     
     # Save the sentiment analysis results
-    df.to_csv(output_csv, index=False)
-    print(f"Sentiment analysis saved to {output_csv}")
+    derive_artifact(
+        input_path, output_path, rows[scored], {"sentiment": [sentiments[i] for i in scored]},
+        append=has_output and incremental,
+    )
+    print(f"Sentiment analysis saved to {output_path}")
     
-    return output_csv
+    return output_path
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+from .instrumentation import emit
+
+DEFAULT_CACHE_PATH = os.path.join("data", "sentiment_cache.sqlite")
+DEFAULT_MAX_ENTRIES = 1_000_000
+
+# SQLite caps the number of bound parameters per statement
+_CHUNK_SIZE = 500
+
+
+def normalize_text(text):
+    return " ".join(str(text).split())
+
+
+def cache_key(text, model_name, model_revision):
+    payload = "\x00".join([normalize_text(text), model_name, model_revision or ""])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SentimentCache:
+    """
+    On-disk sentiment labels keyed by hash(normalized text, model name, model
+    revision), shared across sites and runs. Least recently used entries are
+    evicted once the cache holds more than `max_entries`.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS sentiment (key TEXT PRIMARY KEY, label TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS sentiment_last_used ON sentiment (last_used)")
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def get_many(self, keys):
+        """
+        Returns {key: label} for the cached keys and marks them as recently used.
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        for start in range(0, len(keys), _CHUNK_SIZE):
+            chunk = keys[start:start + _CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(self.connection.execute(
+                f"SELECT key, label FROM sentiment WHERE key IN ({placeholders})", chunk
+            ).fetchall())
+        if found:
+            now = time.time()
+            self.connection.executemany(
+                "UPDATE sentiment SET last_used = ? WHERE key = ?", [(now, key) for key in found]
+            )
+            self.connection.commit()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        now = time.time()
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO sentiment (key, label, last_used) VALUES (?, ?, ?)",
+            [(key, label, now) for key, label in items],
+        )
+        self.connection.commit()
+        self.evict()
+
+    def evict(self):
+        (count,) = self.connection.execute("SELECT COUNT(*) FROM sentiment").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self.connection.execute(
+                "DELETE FROM sentiment WHERE key IN (SELECT key FROM sentiment ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            self.connection.commit()
+        return max(excess, 0)
+
+    def report(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0.0
+        print(f"Sentiment cache: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate)")
+        emit("cache", hits=self.hits, misses=self.misses, hit_rate=rate)
@@ -0,0 +1,173 @@
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .instrumentation import emit, peak_rss_mb
+from .storage import store_for
+
+
+class Stage:
+    """
+    One step of the pipeline graph.
+
+    `run(inputs, force)` receives {upstream stage name: output path} and
+    returns this stage's output path; `force` asks it to recompute even if an
+    output already exists. The fingerprint covers the stage's config, the
+    source of its `code` modules and the fingerprints of its inputs, so a
+    change anywhere upstream invalidates everything downstream of it.
+    """
+
+    def __init__(self, name, run, inputs=(), config=None, code=(), output_columns=(), description=None):
+        self.name = name
+        self.run = run
+        self.inputs = tuple(inputs)
+        self.config = config or {}
+        self.code = tuple(code)
+        self.output_columns = tuple(output_columns)
+        self.description = description or f"Running {name}..."
+
+    def fingerprint(self, input_fingerprints):
+        digest = hashlib.sha256()
+        digest.update(self.name.encode("utf-8"))
+        digest.update(json.dumps(self.config, sort_keys=True, default=str).encode("utf-8"))
+        for obj in self.code:
+            digest.update(inspect.getsource(obj).encode("utf-8"))
+        for name in self.inputs:
+            digest.update(input_fingerprints[name].encode("utf-8"))
+        return digest.hexdigest()
+
+
+class StageGraph:
+    """
+    Runs stages in dependency order, concurrently where they are independent,
+    and records each stage's fingerprint in a JSON manifest. A stage whose
+    recorded fingerprint differs from its current one is forced to recompute.
+
+    Each stage's start and end are emitted as instrumentation events, and
+    with `metrics_path` every run appends its stage timings, row counts and
+    peak memory to that JSON-lines file.
+    """
+
+    def __init__(self, stages, manifest_path, name=None, metrics_path=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.manifest_path = manifest_path
+        self.name = name
+        self.metrics_path = metrics_path
+        self._manifest_lock = threading.Lock()
+        # Seconds each stage took in the last run
+        self.timings = {}
+        # Timings, output rows and peak memory of each stage in the last run
+        self.stage_metrics = {}
+
+        for stage in stages:
+            unknown = [name for name in stage.inputs if name not in self.stages]
+            if unknown:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stages {unknown}")
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _record(self, manifest, name, fingerprint, output):
+        with self._manifest_lock:
+            manifest[name] = {"fingerprint": fingerprint, "output": output}
+            os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+            tmp_path = self.manifest_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.manifest_path)
+
+    def _run_stage(self, stage, outputs, fingerprints, manifest):
+        fingerprint = stage.fingerprint(fingerprints)
+        recorded = manifest.get(stage.name)
+        # Outputs from before the manifest existed are adopted, not recomputed
+        force = recorded is not None and recorded["fingerprint"] != fingerprint
+        if force:
+            print(f"{stage.name}: config or code changed since the last run, recomputing.")
+
+        print(stage.description)
+        emit("stage_start", run=self.name, stage=stage.name, forced=force)
+        start = time.perf_counter()
+        try:
+            output = stage.run({name: outputs[name] for name in stage.inputs}, force)
+        except Exception as e:
+            seconds = time.perf_counter() - start
+            self.stage_metrics[stage.name] = {"seconds": seconds, "status": "failed", "error": repr(e)}
+            emit("stage_failed", run=self.name, stage=stage.name, seconds=seconds, error=repr(e))
+            raise
+        seconds = self.timings[stage.name] = time.perf_counter() - start
+
+        if stage.output_columns:
+            present = set(store_for(output).column_names(output))
+            missing = [column for column in stage.output_columns if column not in present]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' output {output} is missing columns {missing}")
+
+        rows = store_for(output).count_rows(output)
+        metrics = self.stage_metrics[stage.name] = {
+            "seconds": seconds,
+            "status": "ok",
+            "forced": force,
+            "rows": rows,
+            "rows_per_sec": rows / seconds if seconds > 0 else None,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        emit("stage_end", run=self.name, stage=stage.name, output=output, **metrics)
+
+        self._record(manifest, stage.name, fingerprint, output)
+        return output, fingerprint
+
+    def _write_metrics(self, started, seconds, status):
+        record = {"run": self.name, "started": started, "seconds": seconds, "status": status,
+                  "peak_rss_mb": peak_rss_mb(), "stages": self.stage_metrics}
+        os.makedirs(os.path.dirname(self.metrics_path) or ".", exist_ok=True)
+        with open(self.metrics_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+
+    def run(self, max_workers=None):
+        """
+        Runs every stage and returns {stage name: output path}.
+        """
+        self.timings, self.stage_metrics = {}, {}
+        started = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        start = time.perf_counter()
+        emit("run_start", run=self.name, stages=list(self.stages))
+        status = "failed"
+        try:
+            outputs = self._run(max_workers)
+            status = "ok"
+            return outputs
+        finally:
+            seconds = time.perf_counter() - start
+            emit("run_end", run=self.name, status=status, seconds=seconds)
+            if self.metrics_path:
+                self._write_metrics(started, seconds, status)
+
+    def _run(self, max_workers):
+        manifest = self._load_manifest()
+        outputs, fingerprints = {}, {}
+        pending = dict(self.stages)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers or len(self.stages)) as executor:
+            while pending or running:
+                ready = [s for s in pending.values() if all(name in outputs for name in s.inputs)]
+                for stage in ready:
+                    del pending[stage.name]
+                    future = executor.submit(self._run_stage, stage, outputs, fingerprints, manifest)
+                    running[future] = stage.name
+                if not running:
+                    raise ValueError(f"Stages {sorted(pending)} have circular dependencies")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    # Re-raises the stage's exception; other running stages finish first
+                    outputs[name], fingerprints[name] = future.result()
+        return outputs
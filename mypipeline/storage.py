@@ -0,0 +1,244 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; artifacts fall back to CSV
+    pa = None
+    pq = None
+
+# Selects the format stages write their artifacts in: "parquet" or "csv"
+ARTIFACT_FORMAT_ENV = "MYPIPELINE_ARTIFACT_FORMAT"
+
+# Low-cardinality columns stored dictionary-encoded
+CATEGORICAL_COLUMNS = ("sentiment", "theme", "country")
+
+
+class CsvStore:
+    extension = ".csv"
+
+    def read(self, path, columns=None, memory_map=False):
+        return pd.read_csv(path, usecols=columns, memory_map=memory_map)
+
+    def column_names(self, path):
+        return list(pd.read_csv(path, nrows=0).columns)
+
+    def count_rows(self, path):
+        return len(pd.read_csv(path, usecols=[0]))
+
+    def write(self, df, path):
+        _replace(path, lambda tmp_path: df.to_csv(tmp_path, index=False))
+
+    def read_table(self, path, columns=None, memory_map=False):
+        return pa.Table.from_pandas(self.read(path, columns=columns), preserve_index=False)
+
+    def write_table(self, table, path):
+        self.write(table.to_pandas(), path)
+
+
+class ParquetStore:
+    extension = ".parquet"
+
+    def read(self, path, columns=None, memory_map=False):
+        return self.read_table(path, columns=columns, memory_map=memory_map).to_pandas()
+
+    def column_names(self, path):
+        return pq.read_schema(path).names
+
+    def count_rows(self, path):
+        return pq.read_metadata(path).num_rows
+
+    def write(self, df, path):
+        self.write_table(pa.Table.from_pandas(df, preserve_index=False), path)
+
+    def read_table(self, path, columns=None, memory_map=True):
+        return pq.read_table(path, columns=columns, memory_map=memory_map)
+
+    def write_table(self, table, path):
+        _replace(path, lambda tmp_path: pq.write_table(_dictionary_encode(table), tmp_path))
+
+
+_STORES = {"csv": CsvStore(), "parquet": ParquetStore()}
+
+
+def _replace(path, write):
+    # Write next to the target and swap it in, so readers (including ones that
+    # memory-mapped the old file) never see a half-written artifact
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _dictionary_encode(table):
+    for name in CATEGORICAL_COLUMNS:
+        index = table.schema.get_field_index(name)
+        if index >= 0 and not pa.types.is_dictionary(table.schema.field(index).type):
+            table = table.set_column(index, name, table.column(index).dictionary_encode())
+    return table
+
+
+def get_store(artifact_format=None):
+    """
+    Returns the store new artifacts are written with: Parquet when pyarrow is
+    installed, CSV otherwise, unless MYPIPELINE_ARTIFACT_FORMAT says otherwise.
+    """
+    artifact_format = artifact_format or os.environ.get(ARTIFACT_FORMAT_ENV) or ("parquet" if pa else "csv")
+    if artifact_format not in _STORES:
+        raise ValueError(f"Unknown artifact format '{artifact_format}'. Expected one of {sorted(_STORES)}")
+    if artifact_format == "parquet" and pa is None:
+        raise ImportError("The parquet artifact format requires pyarrow")
+    return _STORES[artifact_format]
+
+
+def store_for(path):
+    extension = os.path.splitext(path)[1]
+    for store in _STORES.values():
+        if store.extension == extension:
+            return store
+    raise ValueError(f"No artifact store for '{path}'")
+
+
+def artifact_path(input_path, suffix, store=None):
+    """
+    Names a stage's output after its input, e.g. data/x.csv -> data/x_processed.parquet.
+    """
+    store = store or get_store()
+    return os.path.splitext(input_path)[0] + suffix + store.extension
+
+
+def artifact_exists(path):
+    """
+    True if the artifact exists. A legacy CSV with the same name is converted
+    once, so results computed before the format switch are reused.
+    """
+    if os.path.exists(path):
+        return True
+    legacy_csv = os.path.splitext(path)[0] + ".csv"
+    if legacy_csv != path and os.path.exists(legacy_csv):
+        print(f"Converting {legacy_csv} to {path}")
+        write_artifact(pd.read_csv(legacy_csv), path)
+        return True
+    return False
+
+
+def read_artifact(path, columns=None, memory_map=False):
+    store = store_for(path)
+    if columns is not None:
+        available = set(store.column_names(path))
+        columns = [name for name in dict.fromkeys(columns) if name in available]
+    return store.read(path, columns=columns, memory_map=memory_map)
+
+
+def write_artifact(df, path):
+    store_for(path).write(df, path)
+
+
+def count_rows(path):
+    return store_for(path).count_rows(path)
+
+
+def derive_artifact(input_path, output_path, rows, new_columns, append=False):
+    """
+    Writes the input rows at positions `rows`, plus `new_columns`, to `output_path`.
+
+    With Arrow the untouched input columns are carried over as Arrow buffers,
+    so review text is never converted to Python objects by stages that do not
+    read it. With `append`, the result is added after the existing output.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    output_store = store_for(output_path)
+
+    if pa is None:
+        df = read_artifact(input_path).iloc[rows].reset_index(drop=True)
+        df = df.assign(**{name: list(values) for name, values in new_columns.items()})
+        if append:
+            df = pd.concat([read_artifact(output_path), df], ignore_index=True)
+        output_store.write(df, output_path)
+        return output_path
+
+    table = store_for(input_path).read_table(input_path).take(pa.array(rows))
+    for name, values in new_columns.items():
+        column = pa.array(list(values), from_pandas=True)
+        index = table.schema.get_field_index(name)
+        table = table.set_column(index, name, column) if index >= 0 else table.append_column(name, column)
+    if append:
+        table = pa.concat_tables(
+            [_dictionary_encode(output_store.read_table(output_path, memory_map=False)), _dictionary_encode(table)],
+            promote_options="permissive",
+        )
+    output_store.write_table(table, output_path)
+    return output_path
+
+
+class ArtifactWriter:
+    """
+    Appends DataFrame chunks to an artifact as they are produced, so a stream
+    of results never has to be held in memory at once. The file is built next
+    to `path` and swapped in by `close()`; `abort()` discards it instead.
+
+    `schema` (a pyarrow schema) pins the Parquet column types, which would
+    otherwise be inferred from the first chunk.
+    """
+
+    def __init__(self, path, schema=None):
+        self.path = path
+        self.schema = schema
+        self.rows = 0
+        self._store = store_for(path)
+        self._tmp_path = f"{path}.tmp-{os.getpid()}"
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, df):
+        if isinstance(self._store, ParquetStore):
+            table = _dictionary_encode(pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self._tmp_path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self._tmp_path, mode="a", header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        elif not os.path.exists(self._tmp_path):
+            # Nothing was written; still leave a readable, empty artifact
+            if isinstance(self._store, ParquetStore) and self.schema is not None:
+                self._store.write_table(self.schema.empty_table(), self._tmp_path)
+            else:
+                columns = self.schema.names if self.schema is not None else []
+                self._store.write(pd.DataFrame(columns=columns), self._tmp_path)
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def export_csv(path):
+    """
+    Writes a CSV copy of an artifact next to it and returns the CSV path.
+    """
+    csv_path = os.path.splitext(path)[0] + ".csv"
+    stale = not os.path.exists(csv_path) or os.path.getmtime(csv_path) < os.path.getmtime(path)
+    if csv_path != path and stale:
+        read_artifact(path).to_csv(csv_path, index=False)
+    return csv_path
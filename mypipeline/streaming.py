@@ -0,0 +1,254 @@
+"""
+Streaming pipeline mode.
+
+Reviews flow through scrape -> preprocess -> sentiment -> themes in chunks of
+`chunk_size` rows, one thread per stage, connected by bounded queues. A stage
+that gets ahead blocks until the next one catches up, so at most
+`queue_size` chunks wait between any two stages and memory stays flat however
+many reviews a site has. The first chunk is scored while later pages are
+still downloading, and finished chunks are appended to the output artifact.
+"""
+import os
+import queue
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # artifacts fall back to CSV
+    pa = None
+
+from .dates import date_counts, normalize_dates, report_date_counts
+from .extraction import missing_selectors, parse_last_page_number, parse_reviews
+from .http_client import DEFAULT_HEADERS, PageFetcher
+from .inference import DEFAULT_BATCH_SIZE
+from .instrumentation import emit
+from .scrapper import TRUSTPILOT_BASE_URL, _write_reviews, iter_pages
+from .sentiment_cache import DEFAULT_CACHE_PATH
+from .storage import ArtifactWriter, artifact_exists, artifact_path
+
+DEFAULT_CHUNK_SIZE = 256
+DEFAULT_QUEUE_SIZE = 2
+
+REVIEW_COLUMNS = ["rating", "title", "text", "date", "country"]
+
+_DONE = object()
+
+
+def output_schema():
+    """
+    Column types of the streamed output, pinned so that every chunk is
+    written with the same schema (a chunk without, say, any country would
+    otherwise be inferred as a null column).
+    """
+    return pa.schema(
+        [("rating", pa.int64())]
+        + [(name, pa.string()) for name in REVIEW_COLUMNS[1:]]
+        + [("processed_text", pa.string()), ("date_utc", pa.timestamp("us", tz="UTC"))]
+        + [(name, pa.string()) for name in ("sentiment", "combined_text", "theme")]
+    )
+
+
+class _Pipe:
+    """
+    Bounded queue between two stages. Both ends give up once `failed` is set,
+    so an error in any stage cannot leave another blocked forever.
+    """
+
+    def __init__(self, maxsize, failed):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._failed = failed
+
+    def put(self, item):
+        while not self._failed.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def close(self):
+        self.put(_DONE)
+
+    def __iter__(self):
+        while not self._failed.is_set():
+            try:
+                item = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                return
+            yield item
+
+
+def _start_stage(name, chunks, outbox, failed, errors):
+    # `chunks` is a generator, so its body (and anything it opens) runs on the stage's thread
+    def run():
+        try:
+            for chunk in chunks:
+                if not outbox.put(chunk):
+                    break
+        except BaseException as error:
+            errors.append(error)
+            failed.set()
+        finally:
+            chunks.close()
+            outbox.close()
+
+    thread = threading.Thread(target=run, name=f"stream-{name}", daemon=True)
+    thread.start()
+    return thread
+
+
+def _scraped_chunks(site_to_review, raw_path, chunk_size, base_url, **fetcher_options):
+    if os.path.exists(raw_path):
+        print(f"{raw_path} already exists. Streaming it instead of scraping.")
+        yield from pd.read_csv(raw_path, chunksize=chunk_size)
+        return
+
+    page_url = f"{base_url}{site_to_review}?page="
+    # The raw reviews go to a partial file that only replaces raw_path once the scrape completes
+    partial_path = raw_path + ".partial"
+    pending, total = [], 0
+    dates_before = date_counts()
+    with PageFetcher(headers=DEFAULT_HEADERS, **fetcher_options) as fetcher:
+        first_page = fetcher.fetch(page_url + "1")
+        last_page_number = parse_last_page_number(first_page)
+        print(f"Streaming {last_page_number} pages in chunks of {chunk_size} reviews...")
+
+        _write_reviews(partial_path, [])
+        for page, html in iter_pages(fetcher, page_url, first_page, last_page_number):
+            if html is None:
+                print(f"Skipping page {page}: fetch failed after retries.")
+                continue
+            page_reviews = parse_reviews(html)
+            if not page_reviews:
+                print(f"Warning: page {page} produced no reviews.")
+            _write_reviews(partial_path, page_reviews, append=True)
+            pending.extend(page_reviews)
+            total += len(page_reviews)
+            while len(pending) >= chunk_size:
+                yield pd.DataFrame(pending[:chunk_size], columns=REVIEW_COLUMNS)
+                pending = pending[chunk_size:]
+
+    if not total:
+        os.remove(partial_path)
+        missing = missing_selectors(first_page)
+        raise ValueError(f"No reviews extracted for {site_to_review}. Selectors matching nothing on page 1: {missing}")
+    if pending:
+        yield pd.DataFrame(pending, columns=REVIEW_COLUMNS)
+    os.replace(partial_path, raw_path)
+    print(f"Scraped {total} reviews and saved to {raw_path}")
+    report_date_counts(since=dates_before)
+
+
+def _preprocessed_chunks(chunks):
+    from .preprocessing import preprocess_texts
+
+    for df in chunks:
+        # Chunks are small, so a process pool would cost more than it saves
+        yield df.assign(
+            processed_text=preprocess_texts(df["text"].tolist(), workers=1),
+            date_utc=normalize_dates(df["date"], record=False).set_axis(df.index),
+        )
+
+
+def _scored_chunks(chunks, batch_size, device, dtype, backend, cache_path):
+    from .model_registry import get_model
+    from .sentiment_analysis import MODEL_NAME, score_texts
+    from .sentiment_cache import SentimentCache
+
+    # Opened here so the model loads while the first pages download, and
+    # because SQLite connections belong to the thread that created them
+    handle = get_model(MODEL_NAME, device=device, dtype=dtype, backend=backend)
+    cache = SentimentCache(cache_path) if cache_path else None
+    try:
+        for df in chunks:
+            df = df[df["processed_text"].notna()]
+            sentiments = pd.Series(
+                score_texts(df["processed_text"].tolist(), handle, batch_size=batch_size, cache=cache), index=df.index
+            )
+            # Drop rows where sentiment analysis failed
+            yield df.assign(sentiment=sentiments)[sentiments.notna()]
+    finally:
+        if cache:
+            cache.report()
+            cache.close()
+
+
+def _themed_chunks(chunks):
+    from .theme_detection import match_theme
+
+    for df in chunks:
+        combined_text = df["text"].fillna("") + " " + df["title"].fillna("")
+        themes = pd.Series([match_theme(text) for text in combined_text], index=df.index, dtype=object)
+        df = df.assign(combined_text=combined_text, theme=themes)
+        yield df[themes != "No Theme Detected"]
+
+
+def run_streaming_pipeline(site_to_review, chunk_size=DEFAULT_CHUNK_SIZE, queue_size=DEFAULT_QUEUE_SIZE,
+                           base_url=TRUSTPILOT_BASE_URL, max_workers=8, requests_per_second=5.0, max_retries=3,
+                           timeout=30, batch_size=DEFAULT_BATCH_SIZE, device="cpu", dtype="float32", backend=None,
+                           cache_path=DEFAULT_CACHE_PATH, overwrite=False):
+    """
+    Runs the single-label pipeline for one site chunk by chunk and returns the
+    path of the results, the same artifact run_full_pipeline produces.
+    """
+    if chunk_size < 1 or queue_size < 1:
+        raise ValueError("chunk_size and queue_size must be at least 1")
+
+    raw_path = os.path.join("data", site_to_review.replace('.', '_') + ".csv")
+    output_path = artifact_path(raw_path, "_processed_with_sentiment_with_themes")
+    if artifact_exists(output_path) and not overwrite:
+        print(f"{output_path} already exists. Skipping streaming pipeline.")
+        return output_path
+
+    start = time.perf_counter()
+    emit("run_start", run=site_to_review, stages=["scrape", "preprocess", "sentiment", "themes"], streaming=True)
+    failed = threading.Event()
+    errors = []
+    pipes = [_Pipe(queue_size, failed) for _ in range(4)]
+    scraped, preprocessed, scored, themed = pipes
+    threads = [
+        _start_stage("scrape", _scraped_chunks(
+            site_to_review, raw_path, chunk_size, base_url, max_workers=max_workers,
+            requests_per_second=requests_per_second, max_retries=max_retries, timeout=(5, timeout),
+        ), scraped, failed, errors),
+        _start_stage("preprocess", _preprocessed_chunks(scraped), preprocessed, failed, errors),
+        _start_stage("sentiment", _scored_chunks(preprocessed, batch_size, device, dtype, backend, cache_path),
+                     scored, failed, errors),
+        _start_stage("themes", _themed_chunks(scored), themed, failed, errors),
+    ]
+
+    writer = ArtifactWriter(output_path, schema=output_schema() if pa else None)
+    try:
+        for i, df in enumerate(themed):
+            if i == 0:
+                print(f"First chunk scored {time.perf_counter() - start:.2f}s after start")
+            writer.write(df.reset_index(drop=True))
+            print(f"Chunk {i + 1}: {len(df)} rows written ({writer.rows} total)")
+            emit("progress", stage="stream", done=writer.rows, chunks=i + 1)
+    except BaseException:
+        failed.set()
+        writer.abort()
+        emit("run_end", run=site_to_review, status="failed", seconds=time.perf_counter() - start)
+        raise
+    finally:
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        writer.abort()
+        emit("run_end", run=site_to_review, status="failed", seconds=time.perf_counter() - start)
+        raise errors[0]
+    writer.close()
+    from .theme_detection import remove_theme_hits
+
+    remove_theme_hits(output_path)
+    emit("run_end", run=site_to_review, status="ok", seconds=time.perf_counter() - start, rows=writer.rows)
+
+    print(f"Streamed {writer.rows} rows to {output_path} in {time.perf_counter() - start:.2f}s")
+    return output_path
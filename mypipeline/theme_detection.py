@@ -1,7 +1,13 @@
 import pandas as pd
+import numpy as np
 import os
 import re
 
+from .reviews import REVIEW_KEY_COLUMNS, delta_rows, record_processed_keys, review_keys
+from .storage import (
+    artifact_exists, artifact_path, count_rows, derive_artifact, read_artifact, store_for, write_artifact,
+)
+
 # Define the static themes and their keywords
 THEME_KEYWORDS = {
     "Delivery Issues": [
@@ -106,36 +112,194 @@ THEME_KEYWORDS = {
 }
 
 
-def detect_themes(input_csv):
-    output_csv = input_csv.replace(".csv", "_with_themes.csv")
-    bar_chart_data_path = os.path.join("streamlit_folder", "bar_chart_data.csv")
+def compile_theme_patterns(theme_keywords=THEME_KEYWORDS):
+    """
+    Compiles one case-insensitive, word-bounded alternation per theme.
+
+    Returns a list of (category, pattern) pairs in the same priority order as
+    `theme_keywords`. A pattern matches wherever any of its keywords would
+    have matched on its own with r'\b' + re.escape(kw) + r'\b'.
+    """
+    patterns = []
+    for category, keywords in theme_keywords.items():
+        # Longest first so the engine tries the most specific keyword at each position
+        unique_keywords = sorted(set(keywords), key=len, reverse=True)
+        alternation = "|".join(re.escape(kw) for kw in unique_keywords)
+        patterns.append((category, re.compile(r"\b(?:" + alternation + r")\b", flags=re.I)))
+    return patterns
+
+
+THEME_PATTERNS = compile_theme_patterns()
+
+
+def match_theme(text, patterns=THEME_PATTERNS):
+    for category, pattern in patterns:
+        if pattern.search(text):
+            return category
+    return "No Theme Detected"
+
+
+def theme_hit_counts(texts, patterns=THEME_PATTERNS):
+    """
+    Counts keyword hits for every theme over a whole column of texts.
+
+    Returns the non-zero cells of the review x theme count matrix as a long
+    (row, theme, hits) DataFrame, where row is the position in `texts`,
+    sorted by row and then theme priority. This is the layout
+    save_theme_hits stores, so the matrix is never densified.
+    """
+    values = pd.Series(texts).fillna("").astype(str).tolist()
+    rows, columns, counts = [], [], []
+    # One pass per theme rather than one combined alternation: themes share
+    # keywords ("lost" is in three) and overlap, and a combined pattern would
+    # credit each match to a single theme. Count with Python's re on purpose:
+    # pandas may hand .str.count to a backend whose \b and case folding
+    # differ from detect_themes' semantics
+    for column, (category, pattern) in enumerate(patterns):
+        theme_counts = np.fromiter((len(pattern.findall(text)) for text in values), dtype=np.uint16, count=len(values))
+        (theme_rows,) = np.nonzero(theme_counts)
+        rows.append(theme_rows)
+        columns.append(np.full(len(theme_rows), column))
+        counts.append(theme_counts[theme_rows])
+    rows, columns, counts = (np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+                             for parts in (rows, columns, counts))
+    order = np.lexsort((columns, rows))
+    categories = np.array([category for category, _ in patterns], dtype=object)
+    return pd.DataFrame({
+        "row": rows[order].astype(np.int64),
+        "theme": categories[columns[order].astype(np.int64)],
+        "hits": counts[order].astype(np.uint16),
+    })
+
+
+def primary_theme(hits, length):
+    """
+    Derives the single-label theme of each of `length` reviews from their
+    theme_hit_counts: the first theme, in priority order, with at least one
+    hit.
+    """
+    first = hits.drop_duplicates("row")
+    themes = np.full(length, "No Theme Detected", dtype=object)
+    themes[first["row"].to_numpy()] = first["theme"].to_numpy()
+    return pd.Series(themes)
+
+
+def theme_hits_path(themes_path):
+    return artifact_path(themes_path, "_theme_hits", store_for(themes_path))
+
+
+def save_theme_hits(hits, path, row_offset=0, append=False):
+    # Long (row, theme, hits) layout: only non-zero cells are stored
+    long_hits = hits.assign(row=hits["row"] + row_offset)
+    if append:
+        long_hits = pd.concat([load_theme_hits(path), long_hits], ignore_index=True)
+    write_artifact(long_hits, path)
+
+
+def load_theme_hits(path, memory_map=False):
+    return read_artifact(path, memory_map=memory_map)
+
+
+def remove_theme_hits(themes_path):
+    # A single-label run leaves no hits, so any from an earlier multi-label run are stale
+    path = theme_hits_path(themes_path)
+    if os.path.exists(path):
+        os.remove(path)
+        print(f"Removed stale theme hit counts {path}")
+
+
+def detect_themes(input_path, multi_label=False, incremental=False, overwrite=False):
+    output_path = artifact_path(input_path, "_with_themes")
+    if not multi_label:
+        remove_theme_hits(output_path)
+    has_output = artifact_exists(output_path) and (not multi_label or artifact_exists(theme_hits_path(output_path)))
+    has_output = has_output and not overwrite
+    if has_output and not incremental:
+        print(f"{output_path} already exists. Skipping theme detection.")
+        return output_path
+
+    df = read_artifact(input_path, columns=["text", "title"] + REVIEW_KEY_COLUMNS)
     
-    # Create the streamlit_folder if it doesn't exist
-    os.makedirs("streamlit_folder", exist_ok=True)
+    # In incremental mode only rows missing from the previous output are matched
+    append = has_output and incremental
+    rows = delta_rows(df, output_path) if append else np.arange(len(df))
+    if append and len(rows) == 0:
+        print(f"{output_path} is up to date.")
+        return output_path
     
-    if os.path.exists(output_csv):
-        print(f"{output_csv} already exists. Skipping theme detection.")
-        return output_csv
+    df = df.iloc[rows].reset_index(drop=True)
+    title = df["title"].fillna("") if "title" in df.columns else ""
+    combined_text = df["text"].fillna("") + " " + title
+    
+    if multi_label:
+        # Score every theme, then derive the single label from the matrix.
+        # Every row is kept so the hit matrix lines up with the saved output.
+        hits = theme_hit_counts(combined_text)
+        themes = primary_theme(hits, len(combined_text))
+        keep = np.ones(len(rows), dtype=bool)
+        row_offset = count_rows(output_path) if append else 0
+        save_theme_hits(hits, theme_hits_path(output_path), row_offset=row_offset, append=append)
+        print(f"Theme hit counts saved to {theme_hits_path(output_path)}")
+    else:
+        # Stop at the first matching theme
+        themes = pd.Series([match_theme(text) for text in combined_text])
+        
+        # Remove rows with "No Theme Detected"
+        keep = (themes != "No Theme Detected").to_numpy()
+    
+    # Save the theme detection results
+    derive_artifact(
+        input_path, output_path, rows[keep],
+        {"combined_text": combined_text[keep].tolist(), "theme": themes[keep].tolist()},
+        append=append,
+    )
+    # Rows without a theme are left out of the output, so their keys are recorded separately
+    record_processed_keys(output_path, review_keys(df), append=append)
+    print(f"Theme detection saved to {output_path}")
+    
+    return output_path
 
-    df = pd.read_csv(input_csv)
-    df["combined_text"] = df["text"].fillna("") + " " + df.get("title", "").fillna("")
+
+def join_themes(sentiment_path, themes_path, multi_label=False, overwrite=False):
+    """
+    Adds the theme columns computed on the raw reviews to the sentiment
+    output, keeping only reviews present in both (as running detect_themes
+    on the sentiment output would).
+    """
+    output_path = artifact_path(sentiment_path, "_with_themes")
+    if not multi_label:
+        remove_theme_hits(output_path)
+    inputs = [sentiment_path, themes_path] + ([theme_hits_path(themes_path)] if multi_label else [])
+    outputs = [output_path] + ([theme_hits_path(output_path)] if multi_label else [])
     
-    detected_themes = []
-    for text in df["combined_text"]:
-        theme = "No Theme Detected"
-        for category, keywords in THEME_KEYWORDS.items():
-            if any(re.search(r'\b' + re.escape(kw) + r'\b', text, flags=re.I) for kw in keywords):
-                theme = category
-                break
-        detected_themes.append(theme)
+    # Skip when the joined output is newer than everything it is built from
+    if not overwrite and all(artifact_exists(path) for path in outputs):
+        if min(map(os.path.getmtime, outputs)) >= max(map(os.path.getmtime, inputs)):
+            print(f"{output_path} is up to date. Skipping theme join.")
+            return output_path
     
-    df["theme"] = detected_themes
+    left = read_artifact(sentiment_path, columns=REVIEW_KEY_COLUMNS)
+    right = read_artifact(themes_path, columns=REVIEW_KEY_COLUMNS + ["combined_text", "theme"])
     
-    # Remove rows with "No Theme Detected"
-    df = df[df["theme"] != "No Theme Detected"]
+    # Position of each review key in the theme output (first occurrence)
+    right_keys = review_keys(right)
+    theme_positions = pd.Series(np.arange(len(right)), index=right_keys.to_numpy())
+    theme_positions = theme_positions[~theme_positions.index.duplicated()]
+    matches = review_keys(left).map(theme_positions)
     
-    # Save the theme detection results
-    df.to_csv(output_csv, index=False)
-    print(f"Theme detection saved to {output_csv}")
+    rows = np.flatnonzero(matches.notna().to_numpy())
+    theme_rows = matches.iloc[rows].astype(np.int64).to_numpy()
+    derive_artifact(sentiment_path, output_path, rows, {
+        "combined_text": right["combined_text"].iloc[theme_rows].tolist(),
+        "theme": right["theme"].iloc[theme_rows].tolist(),
+    })
+    
+    if multi_label:
+        # Re-point hit rows from theme output positions to joined output positions
+        joined = pd.DataFrame({"row": np.arange(len(rows)), "theme_row": theme_rows})
+        hits = load_theme_hits(theme_hits_path(themes_path)).rename(columns={"row": "theme_row"})
+        hits = joined.merge(hits, on="theme_row").drop(columns="theme_row").sort_values("row", kind="stable")
+        write_artifact(hits.reset_index(drop=True), theme_hits_path(output_path))
     
-    return output_csv
+    print(f"Theme detection saved to {output_path}")
+    return output_path
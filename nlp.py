@@ -1,5 +1,18 @@
+import sys
+
 from mypipeline import run_full_pipeline
+from mypipeline.instrumentation import ConsoleSink, add_sink
 
 if __name__ == "__main__":
-    result_file = run_full_pipeline("sendle.com")
-    print(f"Final results saved to: {result_file}")
+    # Stage summaries; every run's timings also go to data/<site>_metrics.jsonl
+    add_sink(ConsoleSink(kinds=("stage_end", "stage_failed", "run_end", "site_end")))
+    sites = sys.argv[1:] or ["sendle.com"]
+    if len(sites) == 1:
+        result_file = run_full_pipeline(sites[0])
+        print(f"Final results saved to: {result_file}")
+    else:
+        # Several sites share one pool of model workers; see mypipeline.batch
+        from mypipeline.batch import run_batch
+
+        summaries = run_batch(sites)
+        sys.exit(1 if any(summary["status"] != "ok" for summary in summaries) else 0)